@@ -1,13 +1,227 @@
 import re
-from typing import Dict, List, Any, Optional, Union, Callable
+import string
+import timeit
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple, Union, Callable
 from abc import ABC, abstractmethod
 
+_VARIABLE_PATTERN = re.compile(r"\{([^}]+)\}")
+
 
 class PromptValidationError(Exception):
     """Raised when prompt validation fails"""
     pass
 
 
+class CompiledTemplate:
+    """
+    Pre-parsed form of a `BasePrompt` template, shared by every prompt
+    using the same template string (see `compile_template`).
+
+    Holds the input variables, the result of template validation and, for
+    templates whose fields are plain names without format specs or
+    conversions, the literal segments and field slots needed to render the
+    template with a single `str.join`.
+    """
+
+    __slots__ = ("variables", "unique_variables", "error", "parts", "slots")
+
+    def __init__(self, prompt: str):
+        """
+        :param prompt: Template string with placeholders within curly braces
+        """
+        self.variables: Tuple[str, ...] = tuple(_VARIABLE_PATTERN.findall(prompt))
+        self.unique_variables: Tuple[str, ...] = tuple(dict.fromkeys(self.variables))
+        self.error: Optional[str] = None
+        try:
+            prompt.format(**{var: "test" for var in self.variables})
+        except (KeyError, ValueError) as e:
+            self.error = str(e)
+
+        # parts interleaves literal text with None placeholders; slots maps
+        # each placeholder index to its variable name.
+        self.parts: Optional[List[Optional[str]]] = None
+        self.slots: Tuple[Tuple[int, str], ...] = ()
+        if self.error is not None:
+            return
+        parts: List[Optional[str]] = []
+        slots = []
+        known = set(self.variables)
+        for literal, field, format_spec, conversion in string.Formatter().parse(prompt):
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if format_spec or conversion or field not in known:
+                return  # leave these to str.format
+            slots.append((len(parts), field))
+            parts.append(None)
+        self.parts = parts
+        self.slots = tuple(slots)
+
+    def render(self, values: Dict[str, Any], defaults: Dict[str, Any]) -> str:
+        """Fast path: substitutes `values`, then `defaults`, then "" into the fields."""
+        parts = self.parts.copy()
+        for index, var in self.slots:
+            value = values[var] if var in values else defaults.get(var, "")
+            parts[index] = value if type(value) is str else format(value)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(prompt: str) -> CompiledTemplate:
+    """Parses `prompt` once per distinct template string."""
+    return CompiledTemplate(prompt)
+
+
+# Node kinds of a compiled conditional template.
+_TEXT, _VAR, _IF = 0, 1, 2
+
+# {if condition}, {else}, {/if} or {variable}, in that order of precedence.
+_CONDITIONAL_TOKEN = re.compile(r"\{if\s+([^}]+)\}|\{else\}|\{/if\}|\{([^{}]+)\}")
+
+# Longest operators first, so that ">=" is not read as ">".
+_COMPARISONS = (
+    ("==", lambda a, b: a == b),
+    ("!=", lambda a, b: a != b),
+    (">=", lambda a, b: a >= b),
+    ("<=", lambda a, b: a <= b),
+    (">", lambda a, b: a > b),
+    ("<", lambda a, b: a < b),
+)
+
+
+class Condition:
+    """A pre-parsed `{if ...}` condition: a variable name, optionally compared with a constant."""
+
+    __slots__ = ("source", "left", "op", "compare", "right")
+
+    def __init__(self, source: str):
+        """
+        :param source: Condition text, e.g. "premium", 'tier == "gold"' or "score >= 5"
+        """
+        self.source = source
+        self.left = source
+        self.op: Optional[str] = None
+        self.compare: Optional[Callable[[Any, Any], bool]] = None
+        self.right: Any = None
+        for op, compare in _COMPARISONS:
+            parts = source.split(op)
+            if len(parts) != 2:
+                continue
+            self.left, self.op, self.compare = parts[0].strip(), op, compare
+            right = parts[1].strip()
+            if op == "==":
+                # Equality compares strings, with optional quotes around the constant.
+                self.right = right.strip('"').strip("'")
+            else:
+                try:
+                    self.right = float(right)
+                except ValueError:
+                    self.right = None  # never true
+            break
+
+    def evaluate(self, context: Dict[str, Any]) -> bool:
+        if self.source in context:
+            return bool(context[self.source])
+        if self.op is None:
+            return False
+        if self.op == "==":
+            return str(context.get(self.left, "")) == self.right
+        if self.right is None:
+            return False
+        try:
+            return self.compare(float(context.get(self.left, 0)), self.right)
+        except (ValueError, TypeError):
+            return False
+
+
+def _parse_conditional(text: str) -> Tuple[tuple, ...]:
+    """
+    Parses a conditional template into nodes: ``(_TEXT, text)``,
+    ``(_VAR, name)`` and ``(_IF, Condition, true_nodes, false_nodes)``.
+
+    Blocks may be nested. Branch text is stripped of surrounding whitespace.
+    Unbalanced blocks close at the next {/if} and stray tags are kept as
+    variables, as the regex-based formatter treats them.
+    """
+    nodes = []
+    tokens = list(_CONDITIONAL_TOKEN.finditer(text))
+    pos, i = 0, 0
+    while i < len(tokens):
+        match = tokens[i]
+        if match.start() > pos:
+            nodes.append((_TEXT, text[pos : match.start()]))
+        pos, i = match.end(), i + 1
+        if match.group(1) is None:
+            name = match.group(2) if match.group(2) is not None else match.group(0)[1:-1]
+            nodes.append((_VAR, name))
+            continue
+
+        # Find the matching {/if} and the first {else} at this depth.
+        depth, else_match, j = 1, None, i
+        while j < len(tokens):
+            token = tokens[j].group(0)
+            if tokens[j].group(1) is not None:
+                depth += 1
+            elif token == "{/if}":
+                depth -= 1
+                if depth == 0:
+                    break
+            elif token == "{else}" and depth == 1 and else_match is None:
+                else_match = tokens[j]
+            j += 1
+        if j == len(tokens):
+            # Unbalanced: like the regex formatter, close at the next {/if}.
+            closers = [k for k in range(i, len(tokens)) if tokens[k].group(0) == "{/if}"]
+            if not closers:
+                nodes.append((_VAR, match.group(0)[1:-1]))
+                continue
+            j = closers[0]
+            else_match = next(
+                (t for t in tokens[i:j] if t.group(0) == "{else}"), None
+            )
+        end_match = tokens[j]
+        true_text = text[match.end() : (else_match or end_match).start()]
+        false_text = text[else_match.end() : end_match.start()] if else_match else ""
+        nodes.append(
+            (
+                _IF,
+                Condition(match.group(1).strip()),
+                _parse_conditional(true_text.strip()),
+                _parse_conditional(false_text.strip()),
+            )
+        )
+        pos, i = end_match.end(), j + 1
+    if pos < len(text):
+        nodes.append((_TEXT, text[pos:]))
+    return tuple(nodes)
+
+
+@lru_cache(maxsize=1024)
+def compile_conditional(prompt: str) -> Tuple[tuple, ...]:
+    """Parses a `ConditionalPrompt` template once per distinct template string."""
+    return _parse_conditional(prompt)
+
+
+def _render_nodes(
+    nodes: Tuple[tuple, ...], context: Dict[str, Any], out: List[str], variables: List[str]
+) -> None:
+    for node in nodes:
+        kind = node[0]
+        if kind == _TEXT:
+            out.append(node[1])
+        elif kind == _VAR:
+            variables.append(node[1])
+            out.append(str(context.get(node[1], "")))
+        else:
+            try:
+                taken = node[1].evaluate(context)
+            except Exception:
+                taken = False
+            _render_nodes(node[2] if taken else node[3], context, out, variables)
+
+
 class ConditionalPrompt:
     """Enhanced prompt with conditional logic support"""
     
@@ -31,7 +245,27 @@ class ConditionalPrompt:
         self._conditional_pattern = re.compile(r'\{if\s+([^}]+)\}(.*?)(?:\{else\}(.*?))?\{/if\}', re.DOTALL)
         
     def format_prompt(self, **kwargs) -> str:
-        """Format prompt with conditional logic evaluation"""
+        """
+        Format prompt with conditional logic evaluation.
+
+        The template is compiled once into a tree of literal, variable and
+        conditional nodes (see `compile_conditional`), which is walked here
+        without any regex work.
+        """
+        merged_kwargs = {**self.defaults, **kwargs}
+        out: List[str] = []
+        variables: List[str] = []
+        _render_nodes(compile_conditional(self.prompt), merged_kwargs, out, variables)
+
+        if self.strict:
+            missing_vars = set(variables) - set(merged_kwargs.keys())
+            if missing_vars:
+                raise PromptValidationError(f"Missing required variables: {missing_vars}")
+
+        return "".join(out)
+
+    def _format_with_regex(self, **kwargs) -> str:
+        """Regex-based formatting, re-parsing the template on every call; kept for benchmarking."""
         merged_kwargs = {**self.defaults, **kwargs}
         
         # Process conditional statements
@@ -106,6 +340,39 @@ class ConditionalPrompt:
         return bool(context.get(condition, False))
 
 
+def benchmark_conditional_prompt(iterations: int = 20000, repeat: int = 5) -> Dict[str, float]:
+    """
+    Micro-benchmark of `ConditionalPrompt.format_prompt` (compiled tree)
+    against the regex path, on a template with sequential and nested blocks.
+
+    :param iterations: Calls per timing run
+    :param repeat: Timing runs per path; the fastest is reported
+    :return: Microseconds per call for each path
+    """
+    prompt = ConditionalPrompt(
+        "You are a {role} assistant.\n"
+        "{if premium}Priority support is enabled.{if tier == \"gold\"} Gold tier: no limits.{else} Standard limits apply.{/if}{else}Consider upgrading.{/if}\n"
+        "{if score > 5}The user is experienced.{else}Explain every step.{/if}\n"
+        "{if context}Context:\n{context}{/if}\n"
+        "Question: {question}"
+    )
+    kwargs = {
+        "role": "helpful",
+        "premium": True,
+        "tier": "gold",
+        "score": 7,
+        "context": "Some retrieved context. " * 20,
+        "question": "What is new?",
+    }
+    paths = {"compiled": prompt.format_prompt, "regex": prompt._format_with_regex}
+    return {
+        name: min(timeit.repeat(lambda: fn(**kwargs), number=iterations, repeat=repeat))
+        / iterations
+        * 1e6
+        for name, fn in paths.items()
+    }
+
+
 class BasePrompt:
     def __init__(self, prompt: str, strict: bool = False, defaults: Optional[Dict[str, Any]] = None):
         """
@@ -118,16 +385,19 @@ class BasePrompt:
         self.prompt = prompt
         self.strict = strict
         self.defaults = defaults or {}
-        self._pattern = re.compile(r"\{([^}]+)\}")
+        self._pattern = _VARIABLE_PATTERN
         self._validate_template()
 
+    @property
+    def compiled(self) -> CompiledTemplate:
+        """The shared compiled form of the current template string."""
+        return compile_template(self.prompt)
+
     def _validate_template(self) -> None:
         """Validates the template syntax"""
-        try:
-            test_vars = {var: "test" for var in self.get_input_variables()}
-            self.prompt.format(**test_vars)
-        except (KeyError, ValueError) as e:
-            raise PromptValidationError(f"Invalid template syntax: {e}")
+        error = self.compiled.error
+        if error is not None:
+            raise PromptValidationError(f"Invalid template syntax: {error}")
 
     def format_prompt(self, **kwargs) -> str:
         """
@@ -137,16 +407,21 @@ class BasePrompt:
         :return: The formatted prompt string
         :raises PromptValidationError: If strict mode and required variables are missing
         """
-        variables = self.get_input_variables()
-        merged_kwargs = {**self.defaults, **kwargs}
-        
+        compiled = self.compiled
+        defaults = self.defaults
+
         if self.strict:
-            missing_vars = set(variables) - set(merged_kwargs.keys())
-            if missing_vars:
-                raise PromptValidationError(f"Missing required variables: {missing_vars}")
-        
+            for var in compiled.unique_variables:
+                if var not in kwargs and var not in defaults:
+                    missing_vars = set(compiled.variables) - set({**defaults, **kwargs}.keys())
+                    raise PromptValidationError(f"Missing required variables: {missing_vars}")
+
+        if compiled.parts is not None:
+            return compiled.render(kwargs, defaults)
+
         # Use defaults for missing variables
-        format_dict = {var: merged_kwargs.get(var, self.defaults.get(var, "")) for var in variables}
+        merged_kwargs = {**defaults, **kwargs}
+        format_dict = {var: merged_kwargs.get(var, "") for var in compiled.variables}
         
         try:
             return self.prompt.format(**format_dict)
@@ -159,7 +434,7 @@ class BasePrompt:
 
         :return: List of input variable names
         """
-        return self._pattern.findall(self.prompt)
+        return list(self.compiled.variables)
     
     def validate_inputs(self, **kwargs) -> Dict[str, List[str]]:
         """
@@ -359,6 +634,8 @@ if __name__ == "__main__":
     )
     print(conditional.format_prompt(name="Alice", premium=True))
     print(conditional.format_prompt(name="Bob", premium=False))
+    timings = benchmark_conditional_prompt()
+    print(f"ConditionalPrompt: compiled {timings['compiled']:.2f}us, regex {timings['regex']:.2f}us per call")
     
     # Template composition
     base_template = PromptTemplate("You are an AI assistant.")
@@ -0,0 +1,148 @@
+import math
+import re
+import numpy as np
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over the rows of a `MatrixStorage`.
+
+    Each term's postings are two compact parallel arrays (rows and term
+    frequencies) that grow as documents are added. Deleted rows are removed
+    from the corpus statistics right away; their postings are dropped by
+    `take` during compaction and skipped via the liveness mask until then.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        :param k1: Term-frequency saturation
+        :param b: Document-length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self._vocabulary: Dict[str, int] = {}
+        self._posting_rows: List[array] = []
+        self._posting_tfs: List[array] = []
+        self._df = array("q")
+        self._doc_lengths = array("I")
+        self._n_docs = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def add(self, row: int, text: str) -> None:
+        """Indexes `text` as the document stored at `row`."""
+        tokens = tokenize(text)
+        if row >= len(self._doc_lengths):
+            self._doc_lengths.extend([0] * (row + 1 - len(self._doc_lengths)))
+        self._doc_lengths[row] = len(tokens)
+        self._n_docs += 1
+        self._total_length += len(tokens)
+
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term = self._vocabulary.get(token)
+            if term is None:
+                term = self._vocabulary[token] = len(self._posting_rows)
+                self._posting_rows.append(array("q"))
+                self._posting_tfs.append(array("I"))
+                self._df.append(0)
+            self._posting_rows[term].append(row)
+            self._posting_tfs[term].append(count)
+            self._df[term] += 1
+
+    def remove(self, row: int, text: str) -> None:
+        """Takes a deleted document out of the corpus statistics."""
+        self._n_docs -= 1
+        self._total_length -= self._doc_lengths[row]
+        for token in set(tokenize(text)):
+            term = self._vocabulary.get(token)
+            if term is not None:
+                self._df[term] -= 1
+
+    def take(self, rows: np.ndarray) -> None:
+        """Keeps only the postings of `rows` (e.g. after compaction), renumbered 0..len(rows)-1."""
+        remap = np.full(len(self._doc_lengths), -1, dtype=np.int64)
+        remap[rows] = np.arange(len(rows))
+        for term in range(len(self._posting_rows)):
+            old_rows = np.frombuffer(self._posting_rows[term], dtype=np.int64)
+            if not old_rows.size:
+                continue
+            new_rows = remap[old_rows]
+            keep = new_rows >= 0
+            tfs = np.frombuffer(self._posting_tfs[term], dtype=np.uint32)[keep]
+            self._posting_rows[term] = array("q", new_rows[keep].tobytes())
+            self._posting_tfs[term] = array("I", tfs.tobytes())
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)[rows]
+        self._doc_lengths = array("I", lengths.tobytes())
+
+    def scores(
+        self, query_text: str, alive: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 scores of every document sharing at least one term with the query.
+
+        :param alive: Liveness mask by row; postings of dead rows are skipped
+        :return: (rows, scores), touching only the postings of the query terms
+        """
+        if not self._n_docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        avg_length = self._total_length / self._n_docs
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+        all_rows, all_scores = [], []
+        for token in set(tokenize(query_text)):
+            term = self._vocabulary.get(token)
+            if term is None or self._df[term] <= 0:
+                continue
+            rows = np.frombuffer(self._posting_rows[term], dtype=np.int64)
+            tfs = np.frombuffer(self._posting_tfs[term], dtype=np.uint32).astype(np.float64)
+            df = self._df[term]
+            idf = math.log(1 + (self._n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avg_length)
+            all_rows.append(rows)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not all_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        rows = np.concatenate(all_rows)
+        scores = np.concatenate(all_scores)
+        if alive is not None:
+            live = alive[rows]
+            rows, scores = rows[live], scores[live]
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        return unique_rows, np.bincount(inverse, weights=scores)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        for row, text in enumerate(texts):
+            index.add(row, text)
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked key lists: each key scores sum(1 / (k + rank)) over the lists it appears in.
+
+    :param rankings: Key lists, best first
+    :param k: Damping constant; larger values flatten the contribution of top ranks
+    :return: (key, fused score) pairs, best first
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
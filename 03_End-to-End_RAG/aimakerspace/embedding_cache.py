@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from aimakerspace.embeddings import EmbeddingBackend
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-level cache of embeddings keyed by (model name, sha256 of the text).
+
+    An in-memory LRU of up to `max_memory_items` vectors sits in front of an
+    optional SQLite file holding every vector ever stored, so embeddings
+    survive restarts and are shared between processes using the same file.
+    Vectors are kept as float32.
+    """
+
+    # SQLite caps the number of bound parameters per statement.
+    _LOOKUP_CHUNK = 500
+
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 10000):
+        """
+        :param path: SQLite file backing the cache; None keeps it in memory only
+        :param max_memory_items: Capacity of the in-memory LRU
+        """
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+            self._connection.commit()
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: tuple, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for `texts`, None for misses; the disk is queried once per chunk of misses."""
+        hashes = [_text_hash(text) for text in texts]
+        found: List[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            on_disk: Dict[str, List[int]] = {}
+            for i, text_hash in enumerate(hashes):
+                vector = self._memory.get((model, text_hash))
+                if vector is not None:
+                    self._memory.move_to_end((model, text_hash))
+                    found[i] = vector
+                    self.memory_hits += 1
+                else:
+                    on_disk.setdefault(text_hash, []).append(i)
+
+            if self._connection is not None and on_disk:
+                pending = list(on_disk)
+                for start in range(0, len(pending), self._LOOKUP_CHUNK):
+                    chunk = pending[start : start + self._LOOKUP_CHUNK]
+                    rows = self._connection.execute(
+                        "SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                        f"AND text_hash IN ({', '.join('?' * len(chunk))})",
+                        [model, *chunk],
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember((model, text_hash), vector)
+                        for i in on_disk[text_hash]:
+                            found[i] = vector
+                        self.disk_hits += len(on_disk[text_hash])
+            self.misses += sum(vector is None for vector in found)
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        hashes = [_text_hash(text) for text in texts]
+        with self._lock:
+            for text_hash, vector in zip(hashes, vectors):
+                self._remember((model, text_hash), vector)
+            if self._connection is not None:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    [(model, text_hash, vector.tobytes()) for text_hash, vector in zip(hashes, vectors)],
+                )
+                self._connection.commit()
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class CachedEmbeddingModel(EmbeddingBackend):
+    """
+    Wraps an embedding model so that only texts missing from an
+    `EmbeddingCache` are sent to it, in one batched call per lookup.
+
+    Exposes the same `get_embedding(s)`/`async_get_embedding(s)` methods, so
+    it can be passed to `VectorDatabase` in place of the wrapped model.
+    Embeddings are returned as float32 arrays.
+    """
+
+    def __init__(self, embedding_model, cache: Optional[EmbeddingCache] = None):
+        self.embedding_model = embedding_model
+        self.cache = cache or EmbeddingCache()
+        self.embeddings_model_name = embedding_model.embeddings_model_name
+
+    def _lookup(self, list_of_text: List[str]):
+        """Cached vectors plus the distinct texts that still need embedding."""
+        found = self.cache.get_many(self.embeddings_model_name, list_of_text)
+        missing = list(dict.fromkeys(
+            text for text, vector in zip(list_of_text, found) if vector is None
+        ))
+        return found, missing
+
+    def _fill(self, list_of_text, found, missing, embeddings) -> List[np.ndarray]:
+        self.cache.put_many(self.embeddings_model_name, missing, embeddings)
+        computed = dict(zip(missing, np.asarray(embeddings, dtype=np.float32)))
+        return [
+            vector if vector is not None else computed[text]
+            for text, vector in zip(list_of_text, found)
+        ]
+
+    def get_embeddings(self, list_of_text: List[str]) -> List[np.ndarray]:
+        found, missing = self._lookup(list_of_text)
+        if not missing:
+            return found
+        embeddings = self.embedding_model.get_embeddings(missing)
+        return self._fill(list_of_text, found, missing, embeddings)
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[np.ndarray]:
+        found, missing = self._lookup(list_of_text)
+        if not missing:
+            return found
+        embeddings = await self.embedding_model.async_get_embeddings(missing)
+        return self._fill(list_of_text, found, missing, embeddings)
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return self.get_embeddings([text])[0]
+
+    async def async_get_embedding(self, text: str) -> np.ndarray:
+        return (await self.async_get_embeddings([text]))[0]
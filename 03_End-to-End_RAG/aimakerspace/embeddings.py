@@ -0,0 +1,123 @@
+import asyncio
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+# Multiplier of the rolling n-gram hash and the odd constants of the final mix.
+_POLY = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """64-bit finalizer (from MurmurHash3) spreading every input bit over the output."""
+    h = h ^ (h >> np.uint64(33))
+    h = h * _MIX_1
+    h = h ^ (h >> np.uint64(33))
+    h = h * _MIX_2
+    return h ^ (h >> np.uint64(33))
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interface `VectorDatabase` expects from an embedding model.
+
+    Subclasses implement `get_embeddings`; the single-text and async
+    variants default to it, the async ones running it in the default
+    executor so CPU-bound backends do not block the event loop.
+    """
+
+    embeddings_model_name: str = ""
+
+    @abstractmethod
+    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        ...
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_embeddings, list_of_text)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embeddings([text]))[0]
+
+
+class HashingEmbeddingModel(EmbeddingBackend):
+    """
+    Deterministic local embeddings from hashed character n-grams.
+
+    Every byte n-gram of the lowercased UTF-8 text (n in `ngram_range`) is
+    hashed into one of `dim` buckets with a random sign, and the bucket
+    counts are L2-normalized. Texts sharing many substrings land close
+    together in cosine space, which is enough for offline tests, benchmarks
+    and cheap pre-filtering; it carries no semantics beyond surface overlap.
+
+    A whole batch is hashed in a few vectorized NumPy passes, and results
+    are identical across processes, platforms and runs for the same
+    parameters.
+    """
+
+    def __init__(
+        self,
+        dim: int = 384,
+        ngram_range: Tuple[int, int] = (3, 5),
+        seed: int = 0,
+        batch_size: int = 1024,
+    ):
+        """
+        :param dim: Embedding dimension (number of hash buckets)
+        :param ngram_range: Smallest and largest n-gram length, in bytes
+        :param seed: Changes the hash functions, and so every embedding
+        :param batch_size: Texts hashed per vectorized pass, bounds temporary memory
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.seed = seed
+        self.batch_size = batch_size
+        low, high = ngram_range
+        self.embeddings_model_name = f"hashing-{dim}-{low}-{high}-{seed}"
+
+    def _embed_batch(self, list_of_text: List[str]) -> np.ndarray:
+        encoded = [text.lower().encode("utf-8") for text in list_of_text]
+        lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        doc_of = np.repeat(np.arange(len(encoded)), lengths)
+
+        rows, features = [], []
+        low, high = self.ngram_range
+        with np.errstate(over="ignore"):
+            seed = _mix(np.uint64(self.seed) + np.uint64(0x9E3779B97F4A7C15))
+            for n in range(low, high + 1):
+                n_grams = data.shape[0] - n + 1
+                if n_grams <= 0:
+                    continue
+                h = np.full(n_grams, np.uint64(n), dtype=np.uint64)
+                for j in range(n):
+                    h = h * _POLY + data[j : j + n_grams]
+                # Drop n-grams that run across two texts of the batch.
+                within = doc_of[:n_grams] == doc_of[n - 1 :]
+                rows.append(doc_of[:n_grams][within])
+                features.append(_mix(h[within] ^ seed))
+        out = np.zeros((len(encoded), self.dim), dtype=np.float32)
+        if rows:
+            rows, features = np.concatenate(rows), np.concatenate(features)
+            buckets = (features % np.uint64(self.dim)).astype(np.int64)
+            signs = np.where(features >> np.uint64(63), -1.0, 1.0)
+            out += np.bincount(
+                rows * self.dim + buckets, weights=signs, minlength=out.size
+            ).reshape(out.shape)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+    def get_embeddings(self, list_of_text: List[str]) -> np.ndarray:
+        """(len(list_of_text), dim) float32 array of unit vectors (zero for empty texts)."""
+        if not list_of_text:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.concatenate(
+            [
+                self._embed_batch(list_of_text[start : start + self.batch_size])
+                for start in range(0, len(list_of_text), self.batch_size)
+            ]
+        )
@@ -0,0 +1,163 @@
+import numpy as np
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def cluster_sums(
+    vectors: np.ndarray, assignments: np.ndarray, n_clusters: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-cluster (sum of member vectors, member count)."""
+    counts = np.bincount(assignments, minlength=n_clusters)
+    order = np.argsort(assignments, kind="stable")
+    occupied = np.flatnonzero(counts)
+    sums = np.zeros((n_clusters, vectors.shape[1]), dtype=vectors.dtype)
+    starts = np.cumsum(counts)[occupied] - counts[occupied]
+    sums[occupied] = np.add.reduceat(vectors[order], starts)
+    return sums, counts
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 20,
+    seed: int = 0,
+    chunk_size: int = 8192,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means on unit vectors using cosine similarity.
+
+    :param vectors: (n, d) array of unit-normalized rows
+    :param n_clusters: Number of centroids to fit
+    :param n_iter: Number of Lloyd iterations
+    :param seed: Seed for centroid initialization and re-seeding of empty clusters
+    :param chunk_size: Rows scored against the centroids at a time, bounds peak memory
+    :return: (unit-normalized centroids, assignment of every row)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    assignments = np.zeros(vectors.shape[0], dtype=np.int64)
+
+    for _ in range(n_iter):
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start : start + chunk_size]
+            assignments[start : start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+
+        sums, counts = cluster_sums(vectors, assignments, n_clusters)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+    return centroids, assignments
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the rows of a `MatrixStorage`.
+
+    A k-means coarse quantizer partitions the corpus into `n_lists` cells;
+    a query is only scored against the rows of its `n_probe` closest cells,
+    so raising `n_probe` trades latency for recall.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        min_train_size: int = 1024,
+        max_train_size: int = 65536,
+        n_iter: int = 20,
+        seed: int = 0,
+    ):
+        """
+        :param n_lists: Number of cells; defaults to sqrt(corpus size) at training time
+        :param n_probe: Number of cells scanned per query
+        :param min_train_size: Corpus size below which the database stays on exact search
+        :param max_train_size: Rows sampled to fit the coarse quantizer
+        :param n_iter: K-means iterations
+        :param seed: Seed for sampling and k-means initialization
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.max_train_size = max_train_size
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.empty(0, dtype=np.int64)
+        self._lists: List[array] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def build(self, matrix: np.ndarray) -> None:
+        """Fits the coarse quantizer on `matrix` and assigns every row."""
+        n_lists = self.n_lists or max(1, int(np.sqrt(matrix.shape[0])))
+        rng = np.random.default_rng(self.seed)
+        if matrix.shape[0] > self.max_train_size:
+            sample = matrix[rng.choice(matrix.shape[0], self.max_train_size, replace=False)]
+        else:
+            sample = matrix
+        self.centroids, _ = spherical_kmeans(
+            np.asarray(sample, dtype=np.float32), n_lists, n_iter=self.n_iter, seed=self.seed
+        )
+        self.assignments = np.empty(0, dtype=np.int64)
+        self._lists = [array("q") for _ in range(self.centroids.shape[0])]
+        self.add(np.arange(matrix.shape[0]), matrix)
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "min_train_size": self.min_train_size,
+            "max_train_size": self.max_train_size,
+            "n_iter": self.n_iter,
+            "seed": self.seed,
+        }
+
+    def restore(self, centroids: np.ndarray, assignments: np.ndarray) -> None:
+        """Rebuilds the inverted lists from a saved quantizer and row assignments."""
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.array(assignments, dtype=np.int64)
+        self._lists = [array("q") for _ in range(self.centroids.shape[0])]
+        rows = np.flatnonzero(self.assignments >= 0)
+        for row, cell in zip(rows.tolist(), self.assignments[rows].tolist()):
+            self._lists[cell].append(row)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Assigns (or re-assigns) rows to their closest cell."""
+        if not self.is_trained or len(rows) == 0:
+            return
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.max() >= self.assignments.shape[0]:
+            grown = np.full(max(rows.max() + 1, 2 * self.assignments.shape[0]), -1, dtype=np.int64)
+            grown[: self.assignments.shape[0]] = self.assignments
+            self.assignments = grown
+        cells = np.argmax(np.asarray(vectors, dtype=np.float32) @ self.centroids.T, axis=1)
+        self.assignments[rows] = cells
+        # Rows that moved keep a stale entry in their old list; `candidates`
+        # filters those out against `assignments`.
+        order = np.argsort(cells, kind="stable")
+        boundaries = np.flatnonzero(np.diff(cells[order])) + 1
+        for group in np.split(order, boundaries):
+            self._lists[cells[group[0]]].extend(rows[group].tolist())
+
+    def take(self, rows: np.ndarray) -> None:
+        """Keeps only `rows` (e.g. after compaction), renumbered 0..len(rows)-1."""
+        if self.is_trained:
+            self.restore(self.centroids, self.assignments[rows])
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Rows stored in the `n_probe` cells closest to a unit-normalized query."""
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+        cells = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        found = []
+        for cell in cells:
+            if not self._lists[cell]:
+                continue
+            rows = np.frombuffer(self._lists[cell], dtype=np.int64)
+            found.append(rows[self.assignments[rows] == cell])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
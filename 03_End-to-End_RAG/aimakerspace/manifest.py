@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aimakerspace.embedding_cache import _text_hash
+from aimakerspace.text_utils import _extract_pdf_text
+from aimakerspace.vectordatabase import VectorDatabase
+
+
+def _file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_document(path: str, encoding: str = "utf-8") -> str:
+    """Extracts a PDF's text or reads a text file, matching the aimakerspace loaders."""
+    if path.lower().endswith(".pdf"):
+        return _extract_pdf_text(path)
+    with open(path, "r", encoding=encoding) as f:
+        return f.read()
+
+
+class IngestionManifest:
+    """
+    Record of what has been ingested into a `VectorDatabase`, used to make
+    re-ingestion incremental.
+
+    For every source file the manifest keeps its mtime, size and sha256, and
+    for each of its chunks the chunk's sha256 and vector id. On `aupdate`,
+    files whose mtime and size are unchanged are skipped without being read;
+    files that did change are hashed, and only if their content differs are
+    they re-extracted and re-split. Chunks already present in the database
+    are not re-embedded, and vectors no longer referenced by any file are
+    deleted.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: JSON file the manifest is loaded from (if it exists) and saved to
+        """
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)["files"]
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.files
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the manifest to")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format_version": 1, "files": self.files}, f)
+        os.replace(tmp_path, path)
+
+    def diff(self, paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Compares `paths` with the manifest.
+
+        :return: (new or modified paths, paths in the manifest that are no longer present)
+        """
+        paths = list(dict.fromkeys(paths))
+        changed = []
+        for path in paths:
+            record = self.files.get(path)
+            stat = os.stat(path)
+            if record is not None and (
+                record["mtime"] == stat.st_mtime and record["size"] == stat.st_size
+            ):
+                continue
+            if record is not None and record["sha256"] == _file_sha256(path):
+                # Touched but not modified: remember the new stat, nothing to re-ingest.
+                record["mtime"], record["size"] = stat.st_mtime, stat.st_size
+                continue
+            changed.append(path)
+        present = set(paths)
+        removed = [path for path in self.files if path not in present]
+        return changed, removed
+
+    async def aupdate(
+        self,
+        vector_db: VectorDatabase,
+        paths: Iterable[str],
+        splitter,
+        extract: Callable[[str], str] = read_document,
+        batch_size: int = 256,
+        max_concurrency: int = 4,
+    ) -> Dict[str, int]:
+        """
+        Brings `vector_db` in line with the current contents of `paths`.
+
+        New chunks are stored with a ``{"source": path}`` metadata payload.
+        The manifest is saved afterwards if it has a `path`; the database is
+        not, so call `vector_db.save` as well when persisting both.
+
+        :param paths: Every source file that should be in the database
+        :param splitter: Anything with a `split(text) -> List[str]` method
+        :param extract: Reads a file's text
+        :return: Counts of changed and removed files, embedded chunks and deleted vectors
+        """
+        changed, removed = self.diff(paths)
+
+        stale_ids = set()
+        for path in removed:
+            stale_ids.update(chunk["id"] for chunk in self.files.pop(path)["chunks"])
+
+        split_files: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+        pending: Dict[str, Dict[str, Any]] = {}
+        for path in changed:
+            if path in self.files:
+                stale_ids.update(chunk["id"] for chunk in self.files[path]["chunks"])
+            stat = os.stat(path)
+            record = {
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": _file_sha256(path),
+            }
+            chunks = splitter.split(extract(path))
+            split_files[path] = (record, chunks)
+            for chunk in chunks:
+                if vector_db.get_id(chunk) is None:
+                    pending.setdefault(chunk, {"source": path})
+
+        if pending:
+            await vector_db.abuild_from_iterable(
+                pending.items(), batch_size=batch_size, max_concurrency=max_concurrency
+            )
+
+        for path, (record, chunks) in split_files.items():
+            record["chunks"] = [
+                {"sha256": _text_hash(chunk), "id": vector_db.get_id(chunk)}
+                for chunk in chunks
+            ]
+            self.files[path] = record
+
+        # Identical chunks in different files share one vector, so only drop
+        # ids that no remaining file refers to.
+        if stale_ids:
+            stale_ids -= {
+                chunk["id"] for record in self.files.values() for chunk in record["chunks"]
+            }
+        n_deleted = vector_db.delete(stale_ids) if stale_ids else 0
+
+        if self.path is not None:
+            self.save()
+        return {
+            "changed_files": len(changed),
+            "removed_files": len(removed),
+            "embedded_chunks": len(pending),
+            "deleted_vectors": n_deleted,
+        }
@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+class MetadataStore:
+    """
+    Column-wise metadata payloads, aligned with the rows of a `MatrixStorage`.
+
+    Every field is a column (a list with one entry per row, `None` when a row
+    does not set it). Fields listed in `indexed_fields` also keep an inverted
+    index from value to rows, so equality and membership filters on them are
+    answered without touching the other rows.
+    """
+
+    def __init__(self, indexed_fields: Optional[Iterable[str]] = None):
+        self.columns: Dict[str, List[Any]] = {}
+        self.indexed_fields = set(indexed_fields or ())
+        self._inverted: Dict[str, Dict[Any, Set[int]]] = {
+            field: {} for field in self.indexed_fields
+        }
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _ensure_size(self, size: int) -> None:
+        if size <= self._size:
+            return
+        for column in self.columns.values():
+            column.extend([None] * (size - self._size))
+        self._size = size
+
+    def set(self, row: int, metadata: Optional[Dict[str, Any]]) -> None:
+        """Replaces the payload of `row`; fields it does not set become `None`."""
+        self._ensure_size(row + 1)
+        metadata = metadata or {}
+        for field in metadata:
+            if field not in self.columns:
+                self.columns[field] = [None] * self._size
+        for field, column in self.columns.items():
+            old, new = column[row], metadata.get(field)
+            column[row] = new
+            if field in self._inverted and old != new:
+                if old is not None:
+                    self._inverted[field][old].discard(row)
+                if new is not None:
+                    self._inverted[field].setdefault(new, set()).add(row)
+
+    def get(self, row: int) -> Dict[str, Any]:
+        return {
+            field: column[row]
+            for field, column in self.columns.items()
+            if column[row] is not None
+        }
+
+    def _indexed_rows(self, field: str, condition: Any) -> Optional[Set[int]]:
+        """Rows matching an equality/membership condition via the inverted index."""
+        if field not in self._inverted or callable(condition):
+            return None
+        postings = self._inverted[field]
+        if isinstance(condition, (list, tuple, set, frozenset)):
+            rows: Set[int] = set()
+            for value in condition:
+                rows |= postings.get(value, set())
+            return rows
+        return set(postings.get(condition, set()))
+
+    @staticmethod
+    def _matches(value: Any, condition: Any) -> bool:
+        if callable(condition):
+            return value is not None and bool(condition(value))
+        if isinstance(condition, (list, tuple, set, frozenset)):
+            return value in condition
+        return value == condition
+
+    def filter_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        """
+        Rows whose payload satisfies every condition in `filter`.
+
+        A condition is a value (equality), a list/tuple/set of values
+        (membership) or a callable predicate, e.g. ``lambda d: d >= "2024-01"``.
+        Indexed fields are resolved first; remaining conditions are then only
+        checked on the surviving rows.
+        """
+        candidates: Optional[Set[int]] = None
+        remaining: Dict[str, Any] = {}
+        for field, condition in filter.items():
+            rows = self._indexed_rows(field, condition)
+            if rows is None:
+                remaining[field] = condition
+            else:
+                candidates = rows if candidates is None else candidates & rows
+
+        if candidates is None:
+            candidates = range(self._size)
+        for field, condition in remaining.items():
+            column = self.columns.get(field)
+            if column is None:
+                return np.empty(0, dtype=np.int64)
+            candidates = [row for row in candidates if self._matches(column[row], condition)]
+
+        return np.fromiter(sorted(candidates), dtype=np.int64)
+
+    def take(self, rows: np.ndarray) -> None:
+        """Keeps only `rows` (e.g. after compaction), renumbered 0..len(rows)-1."""
+        rows = rows.tolist()
+        self.columns = {
+            field: [column[row] for row in rows] for field, column in self.columns.items()
+        }
+        self._size = len(rows)
+        self._rebuild_inverted()
+
+    def _rebuild_inverted(self) -> None:
+        self._inverted = {field: {} for field in self.indexed_fields}
+        for field in self.indexed_fields:
+            for row, value in enumerate(self.columns.get(field, ())):
+                if value is not None:
+                    self._inverted[field].setdefault(value, set()).add(row)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"indexed_fields": sorted(self.indexed_fields), "columns": self.columns}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], size: int) -> "MetadataStore":
+        store = cls(indexed_fields=data["indexed_fields"])
+        store._size = size
+        store.columns = data["columns"]
+        store._rebuild_inverted()
+        return store
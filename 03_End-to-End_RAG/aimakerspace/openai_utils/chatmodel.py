@@ -1,23 +1,109 @@
 from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from typing import Any, List, Optional
+from aimakerspace.openai_utils.retry import TRANSIENT_ERRORS, backoff_delay
+import asyncio
+import httpx
 import os
 
 load_dotenv()
 
 
 class ChatOpenAI:
-    def __init__(self, model_name: str = "gpt-4o-mini"):
+    """
+    Chat completions client that keeps one sync and one async OpenAI client
+    (and their HTTP connection pools) for its whole lifetime, so repeated
+    calls reuse open keep-alive connections instead of paying a new TCP/TLS
+    handshake each time.
+
+    The clients are created on first use. Release them with `close()` /
+    `aclose()` or by using the instance as a (async) context manager. As
+    with any async HTTP pool, use the async methods from a single event loop.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        max_retries: int = 2,
+    ):
+        """
+        :param model_name: OpenAI chat model
+        :param timeout: Seconds allowed for reading, writing or waiting on the pool
+        :param connect_timeout: Seconds allowed to open a connection
+        :param max_connections: Upper bound on concurrent connections per client
+        :param max_keepalive_connections: Idle connections kept open for reuse
+        :param keepalive_expiry: Seconds an idle connection is kept open
+        :param max_retries: Retries performed by the OpenAI client on transient errors
+        """
         self.model_name = model_name
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if self.openai_api_key is None:
             raise ValueError("OPENAI_API_KEY is not set")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_retries = max_retries
+        self._client: Optional[OpenAI] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI(
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.Client(limits=self.limits, timeout=self.timeout),
+            )
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout),
+            )
+        return self._async_client
+
+    def close(self) -> None:
+        """Closes the sync client; the async one needs `aclose`."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        """Closes both clients."""
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def __enter__(self) -> "ChatOpenAI":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "ChatOpenAI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
     def run(self, messages, text_only: bool = True, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
 
-        client = OpenAI()
-        response = client.chat.completions.create(
+        response = self.client.chat.completions.create(
             model=self.model_name, messages=messages, **kwargs
         )
 
@@ -25,14 +111,86 @@ class ChatOpenAI:
             return response.choices[0].message.content
 
         return response
+
+    async def arun(self, messages, text_only: bool = True, **kwargs):
+        if not isinstance(messages, list):
+            raise ValueError("messages must be a list")
+
+        response = await self.async_client.chat.completions.create(
+            model=self.model_name, messages=messages, **kwargs
+        )
+
+        if text_only:
+            return response.choices[0].message.content
+
+        return response
+
+    async def abatch(
+        self,
+        list_of_messages: List[list],
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        return_exceptions: bool = False,
+        text_only: bool = True,
+        **kwargs,
+    ) -> List[Any]:
+        """
+        Runs one completion per message list, at most `max_concurrency` at a
+        time, and returns the results in input order.
+
+        Each item is retried on rate limits and other transient errors with
+        full-jitter exponential backoff, on top of the client's own retries.
+
+        :param return_exceptions: Put the error of an item that still fails in its
+            slot instead of cancelling the rest and raising it
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def complete(messages):
+            async with semaphore:
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await self.arun(messages, text_only=text_only, **kwargs)
+                    except TRANSIENT_ERRORS as e:
+                        if attempt == max_retries:
+                            raise
+                        await asyncio.sleep(
+                            backoff_delay(attempt, e, initial_backoff, max_backoff)
+                        )
+
+        tasks = [asyncio.ensure_future(complete(messages)) for messages in list_of_messages]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def batch(self, list_of_messages: List[list], **kwargs) -> List[Any]:
+        """
+        Blocking `abatch`, for scripts without a running event loop.
+
+        The async client is closed afterwards since its connections belong
+        to the event loop this call creates.
+        """
+
+        async def run_batch():
+            try:
+                return await self.abatch(list_of_messages, **kwargs)
+            finally:
+                if self._async_client is not None:
+                    await self._async_client.close()
+                    self._async_client = None
+
+        return asyncio.run(run_batch())
     
     async def astream(self, messages, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
-        
-        client = AsyncOpenAI()
 
-        stream = await client.chat.completions.create(
+        stream = await self.async_client.chat.completions.create(
             model=self.model_name,
             messages=messages,
             stream=True,
@@ -1,13 +1,79 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, OpenAI
 import openai
-from typing import List
+from aimakerspace.embeddings import EmbeddingBackend
+from aimakerspace.openai_utils.retry import TRANSIENT_ERRORS, backoff_delay
+from aimakerspace.text_utils import _get_encoding
+from functools import partial
+from typing import List, Optional, Sequence, Tuple
 import os
 import asyncio
 
 
-class EmbeddingModel:
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small"):
+# Set once the tokenizer failed to load, so offline calls do not retry the download.
+_encoding_unavailable = False
+
+
+def count_tokens(
+    list_of_text: List[str], model_name: str = "text-embedding-3-small"
+) -> List[int]:
+    """
+    Token count of every text. Without tiktoken (or its BPE file) the UTF-8
+    length is used instead, an upper bound since no token is shorter than
+    one byte.
+    """
+    global _encoding_unavailable
+    encoding = None
+    if not _encoding_unavailable:
+        try:
+            encoding = _get_encoding(model_name)
+        except Exception:
+            _encoding_unavailable = True
+    if encoding is None:
+        return [len(text.encode("utf-8")) for text in list_of_text]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list_of_text)]
+
+
+def pack_batches(
+    token_counts: Sequence[int], max_batch_size: int, max_batch_tokens: int
+) -> List[Tuple[int, int]]:
+    """
+    Greedily groups consecutive inputs into `(start, stop)` ranges holding at
+    most `max_batch_size` items and `max_batch_tokens` tokens (an input that
+    alone exceeds the token budget gets a batch of its own).
+    """
+    batches, start, tokens = [], 0, 0
+    for i, n_tokens in enumerate(token_counts):
+        if i > start and (i - start >= max_batch_size or tokens + n_tokens > max_batch_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += n_tokens
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
+
+
+class EmbeddingModel(EmbeddingBackend):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        max_concurrency: int = 8,
+        max_batch_size: int = 2048,
+        max_batch_tokens: int = 300_000,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        :param embeddings_model_name: OpenAI embedding model
+        :param max_concurrency: Embedding requests in flight at once in `async_get_embeddings`
+        :param max_batch_size: Inputs per request (the API accepts at most 2048)
+        :param max_batch_tokens: Tokens per request (the API accepts at most 300k)
+        :param max_retries: Retries of a request failing with a transient error
+        :param initial_backoff: Upper bound in seconds of the first randomized retry delay;
+            doubles on every attempt
+        :param max_backoff: Cap in seconds on the retry delay
+        """
         load_dotenv()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.async_client = AsyncOpenAI()
@@ -19,13 +85,62 @@ class EmbeddingModel:
             )
         openai.api_key = self.openai_api_key
         self.embeddings_model_name = embeddings_model_name
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+    async def _aembed_with_retry(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                embedding_response = await self.async_client.embeddings.create(
+                    input=batch, model=self.embeddings_model_name
+                )
+                return [embeddings.embedding for embeddings in embedding_response.data]
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(
+                    backoff_delay(attempt, e, self.initial_backoff, self.max_backoff)
+                )
 
     async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = await self.async_client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
+        """
+        Embeds any number of texts, packed into token-budgeted batches sent
+        by at most `max_concurrency` concurrent requests, each retried with
+        exponential backoff on rate limits and other transient errors.
+        Embeddings are returned in input order.
+        """
+        if not list_of_text:
+            return []
+        # Tokenizing a large input is CPU-bound, so keep it off the event loop.
+        loop = asyncio.get_running_loop()
+        token_counts = await loop.run_in_executor(
+            None, partial(count_tokens, list_of_text, self.embeddings_model_name)
         )
+        batches = pack_batches(token_counts, self.max_batch_size, self.max_batch_tokens)
+        results: List[Optional[List[float]]] = [None] * len(list_of_text)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+        async def run(start: int, stop: int) -> None:
+            async with semaphore:
+                embeddings = await self._aembed_with_retry(list_of_text[start:stop])
+                if len(embeddings) != stop - start:
+                    raise ValueError(
+                        f"Expected {stop - start} embeddings from the API, got {len(embeddings)}"
+                    )
+                results[start:stop] = embeddings
+
+        tasks = [asyncio.ensure_future(run(start, stop)) for start, stop in batches]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return results
 
     async def async_get_embedding(self, text: str) -> List[float]:
         embedding = await self.async_client.embeddings.create(
@@ -0,0 +1,20 @@
+import openai
+import random
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx responses.
+TRANSIENT_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def backoff_delay(attempt: int, error: Exception, initial: float, maximum: float) -> float:
+    """Seconds to wait before retry `attempt`: the server's Retry-After if given, else full jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), maximum)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(maximum, initial * 2**attempt))
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from aimakerspace.openai_utils.chatmodel import ChatOpenAI
+from aimakerspace.openai_utils.prompts import SystemRolePrompt, UserRolePrompt
+from aimakerspace.vectordatabase import VectorDatabase
+
+RAG_SYSTEM_TEMPLATE = """You are a knowledgeable assistant that answers questions based strictly on provided context.
+
+Instructions:
+- Only answer questions using information from the provided context
+- If the context doesn't contain relevant information, respond with "I don't know"
+- Be accurate and cite specific parts of the context when possible
+- Keep responses {response_style} and {response_length}
+- Only use the provided context. Do not use external knowledge."""
+
+RAG_USER_TEMPLATE = """Context Information:
+{context}
+
+Number of relevant sources found: {context_count}
+
+Question: {user_query}
+
+Please provide your answer based solely on the context above."""
+
+
+class RetrievalAugmentedQAPipeline:
+    """
+    Async retrieve-then-generate pipeline over a `VectorDatabase` that
+    streams the answer from `ChatOpenAI.astream`.
+
+    The query embedding request is started first and the system message is
+    formatted while it is in flight; the completion is requested as soon as
+    the retrieved context is in the user message. Every run records the
+    duration of each stage in seconds: ``embed``, ``search`` and ``prompt``,
+    plus ``first_token`` and ``total`` measured from the start of the run.
+    """
+
+    def __init__(
+        self,
+        llm: ChatOpenAI,
+        vector_db_retriever: VectorDatabase,
+        system_prompt: Optional[SystemRolePrompt] = None,
+        user_prompt: Optional[UserRolePrompt] = None,
+        response_style: str = "concise",
+        response_length: str = "brief",
+    ):
+        """
+        :param system_prompt: Defaults to `RAG_SYSTEM_TEMPLATE`, formatted with the response style/length
+        :param user_prompt: Defaults to `RAG_USER_TEMPLATE`, formatted with the context and the query
+        """
+        self.llm = llm
+        self.vector_db_retriever = vector_db_retriever
+        self.system_prompt = system_prompt or SystemRolePrompt(RAG_SYSTEM_TEMPLATE)
+        self.user_prompt = user_prompt or UserRolePrompt(RAG_USER_TEMPLATE)
+        self.response_style = response_style
+        self.response_length = response_length
+
+    async def astream_pipeline(
+        self,
+        user_query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **llm_kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Retrieves context and starts generation.
+
+        :return: Dictionary with the async token iterator under ``response``, the
+            retrieved ``context`` as (text, score) pairs, the ``prompts_used`` and
+            the ``timings``, whose ``first_token`` and ``total`` entries are filled
+            in while the response is consumed
+        """
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        embedding_model = self.vector_db_retriever.embedding_model
+
+        async def embed_query():
+            embed_start = time.perf_counter()
+            vector = await embedding_model.async_get_embedding(user_query)
+            timings["embed"] = time.perf_counter() - embed_start
+            return vector
+
+        query_embedding = asyncio.ensure_future(embed_query())
+        # Let the task run up to its first await, so the request is in flight
+        # while the system message is formatted.
+        await asyncio.sleep(0)
+
+        prompt_start = time.perf_counter()
+        system_message = self.system_prompt.create_message(
+            response_style=self.response_style, response_length=self.response_length
+        )
+        prompt_time = time.perf_counter() - prompt_start
+
+        query_vector = await query_embedding
+
+        search_start = time.perf_counter()
+        context_list = self.vector_db_retriever.search(query_vector, k=k, filter=filter)
+        timings["search"] = time.perf_counter() - search_start
+
+        prompt_start = time.perf_counter()
+        context = "\n\n".join(
+            f"[Source {i}]: {text}" for i, (text, _) in enumerate(context_list, 1)
+        )
+        user_message = self.user_prompt.create_message(
+            context=context, context_count=len(context_list), user_query=user_query
+        )
+        timings["prompt"] = prompt_time + time.perf_counter() - prompt_start
+
+        messages = [system_message, user_message]
+
+        async def tokens() -> AsyncIterator[str]:
+            async for token in self.llm.astream(messages, **llm_kwargs):
+                if "first_token" not in timings:
+                    timings["first_token"] = time.perf_counter() - start
+                yield token
+            timings["total"] = time.perf_counter() - start
+
+        return {
+            "response": tokens(),
+            "context": context_list,
+            "context_count": len(context_list),
+            "prompts_used": {"system": system_message, "user": user_message},
+            "timings": timings,
+        }
+
+    async def arun_pipeline(
+        self,
+        user_query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **llm_kwargs,
+    ) -> Dict[str, Any]:
+        """Same as `astream_pipeline`, with the streamed response collected into a string."""
+        result = await self.astream_pipeline(user_query, k=k, filter=filter, **llm_kwargs)
+        result["response"] = "".join([token async for token in result["response"]])
+        return result
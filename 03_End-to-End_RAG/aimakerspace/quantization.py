@@ -0,0 +1,272 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+from aimakerspace.index import cluster_sums
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 20,
+    seed: int = 0,
+) -> np.ndarray:
+    """Plain (euclidean) k-means; returns the centroids."""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        # |x|^2 is constant per row and does not change the argmin.
+        distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+        assignments = np.argmin(distances, axis=1)
+        sums, counts = cluster_sums(vectors, assignments, n_clusters)
+        occupied = counts > 0
+        centroids[occupied] = sums[occupied] / counts[occupied, None]
+        empty = np.flatnonzero(~occupied)
+        if empty.size:
+            centroids[empty] = vectors[rng.choice(vectors.shape[0], empty.size)]
+    return centroids
+
+
+class Quantizer(ABC):
+    """
+    Base class for compressed vector codes kept alongside a `MatrixStorage`.
+
+    Codes are stored per storage row and scored asymmetrically: the query
+    stays in full precision and only the corpus side is compressed.
+    Subclasses implement `train`, `encode`, `_prepare` and `_score_codes`.
+    """
+
+    kind: str = ""
+    # Memory layout of `codes`; "F" keeps each code column contiguous.
+    code_order: str = "C"
+
+    def __init__(
+        self,
+        min_train_size: int = 1024,
+        max_train_size: int = 65536,
+        rerank_factor: int = 4,
+        seed: int = 0,
+        chunk_size: int = 16384,
+    ):
+        """
+        :param min_train_size: Corpus size below which the database keeps scanning float32 rows
+        :param max_train_size: Rows sampled to fit the quantizer
+        :param rerank_factor: Re-score the top `k * rerank_factor` candidates with the
+            full-precision vectors; 0 returns the approximate scores as-is
+        :param seed: Seed for sampling and training
+        :param chunk_size: Codes decoded per block while scanning, bounds temporary memory
+        """
+        self.min_train_size = min_train_size
+        self.max_train_size = max_train_size
+        self.rerank_factor = rerank_factor
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.is_trained = False
+        self.codes: Optional[np.ndarray] = None
+        self._size = 0
+
+    @abstractmethod
+    def train(self, vectors: np.ndarray) -> None:
+        ...
+
+    @abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def _prepare(self, query: np.ndarray) -> Any:
+        """Per-query state shared by every chunk of the scan."""
+
+    @abstractmethod
+    def _score_codes(self, prepared: Any, codes: np.ndarray) -> np.ndarray:
+        ...
+
+    def build(self, matrix: np.ndarray) -> None:
+        """Trains on a sample of `matrix` and encodes every row."""
+        rng = np.random.default_rng(self.seed)
+        if matrix.shape[0] > self.max_train_size:
+            sample = matrix[rng.choice(matrix.shape[0], self.max_train_size, replace=False)]
+        else:
+            sample = matrix
+        self.train(np.asarray(sample, dtype=np.float32))
+        self.is_trained = True
+        self.codes, self._size = None, 0
+        for start in range(0, matrix.shape[0], self.chunk_size):
+            stop = min(start + self.chunk_size, matrix.shape[0])
+            self.add(np.arange(start, stop), matrix[start:stop])
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if not self.is_trained or len(rows) == 0:
+            return
+        codes = self.encode(np.asarray(vectors, dtype=np.float32))
+        rows = np.asarray(rows, dtype=np.int64)
+        needed = int(rows.max()) + 1
+        if self.codes is None or needed > self.codes.shape[0]:
+            capacity = max(needed, 0 if self.codes is None else 2 * self.codes.shape[0])
+            grown = np.zeros(
+                (capacity,) + codes.shape[1:], dtype=codes.dtype, order=self.code_order
+            )
+            if self.codes is not None:
+                grown[: self._size] = self.codes[: self._size]
+            self.codes = grown
+        self.codes[rows] = codes
+        self._size = max(self._size, needed)
+
+    def take(self, rows: np.ndarray) -> None:
+        """Keeps only the codes of `rows` (e.g. after compaction), renumbered 0..len(rows)-1."""
+        if self.is_trained:
+            self.codes = np.array(self.codes[rows], order=self.code_order)
+            self._size = len(rows)
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate inner products of a unit-normalized query with all (or `rows`) codes."""
+        codes = self.codes[: self._size] if rows is None else self.codes[rows]
+        prepared = self._prepare(query)
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], self.chunk_size):
+            stop = start + self.chunk_size
+            out[start:stop] = self._score_codes(prepared, codes[start:stop])
+        return out
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "min_train_size": self.min_train_size,
+            "max_train_size": self.max_train_size,
+            "rerank_factor": self.rerank_factor,
+            "seed": self.seed,
+            "chunk_size": self.chunk_size,
+        }
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Trained parameters and codes, as arrays suitable for `np.savez`."""
+        return {"codes": self.codes[: self._size]}
+
+    def restore(self, state: Dict[str, np.ndarray]) -> None:
+        self.codes = np.array(state["codes"], order=self.code_order)
+        self._size = self.codes.shape[0]
+        self.is_trained = True
+
+
+class ScalarQuantizer(Quantizer):
+    """
+    8-bit scalar quantization: every dimension is mapped onto 256 levels
+    between its trained min and max, a 4x saving over float32.
+    """
+
+    kind = "int8"
+    # Codes are widened to float32 this many rows at a time, into a buffer that
+    # stays in cache; converting a whole chunk at once is slower than float32.
+    _block_rows = 256
+
+    def train(self, vectors: np.ndarray) -> None:
+        self.low = vectors.min(axis=0)
+        spread = vectors.max(axis=0) - self.low
+        self.scale = np.where(spread == 0, 1, spread / 255).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((vectors - self.low) / self.scale), 0, 255).astype(np.uint8)
+
+    def _prepare(self, query: np.ndarray) -> Tuple[np.ndarray, float]:
+        # q . (low + scale * code) == q . low + (q * scale) . code
+        return (query * self.scale).astype(np.float32), float(query @ self.low)
+
+    def _score_codes(self, prepared: Tuple[np.ndarray, float], codes: np.ndarray) -> np.ndarray:
+        weights, bias = prepared
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        buffer = np.empty((min(self._block_rows, codes.shape[0]), codes.shape[1]), dtype=np.float32)
+        for start in range(0, codes.shape[0], self._block_rows):
+            block = codes[start : start + self._block_rows]
+            widened = buffer[: block.shape[0]]
+            np.copyto(widened, block, casting="unsafe")
+            np.matmul(widened, weights, out=out[start : start + block.shape[0]])
+        return out + bias
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {**super().get_state(), "low": self.low, "scale": self.scale}
+
+    def restore(self, state: Dict[str, np.ndarray]) -> None:
+        super().restore(state)
+        self.low, self.scale = np.array(state["low"]), np.array(state["scale"])
+
+
+class ProductQuantizer(Quantizer):
+    """
+    Product quantization: vectors are cut into `n_subvectors` slices and each
+    slice is replaced by the id of its nearest of 256 trained centroids, so a
+    1536-dim float32 vector with 64 subvectors shrinks from 6 KB to 64 bytes.
+    """
+
+    kind = "pq"
+    code_order = "F"
+
+    def __init__(self, n_subvectors: int = 64, n_iter: int = 15, **kwargs):
+        """
+        :param n_subvectors: Number of slices (bytes per vector); must divide the dimension
+        :param n_iter: K-means iterations per slice
+        """
+        # 256 centroids per slice are well fitted by a few dozen points each.
+        kwargs.setdefault("max_train_size", 256 * 64)
+        super().__init__(**kwargs)
+        self.n_subvectors = n_subvectors
+        self.n_iter = n_iter
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, d) -> (n_subvectors, n, d / n_subvectors)"""
+        n, dim = vectors.shape
+        if dim % self.n_subvectors:
+            raise ValueError(
+                f"Dimension {dim} is not divisible by n_subvectors={self.n_subvectors}"
+            )
+        return vectors.reshape(n, self.n_subvectors, -1).transpose(1, 0, 2)
+
+    def train(self, vectors: np.ndarray) -> None:
+        self.codebooks = np.stack(
+            [
+                kmeans(np.ascontiguousarray(block), 256, n_iter=self.n_iter, seed=self.seed + i)
+                for i, block in enumerate(self._split(vectors))
+            ]
+        )
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((vectors.shape[0], self.n_subvectors), dtype=np.uint8)
+        for i, block in enumerate(self._split(vectors)):
+            block = np.ascontiguousarray(block)
+            codebook = self.codebooks[i]
+            distances = -2 * block @ codebook.T + (codebook ** 2).sum(axis=1)
+            codes[:, i] = np.argmin(distances, axis=1)
+        return codes
+
+    def _prepare(self, query: np.ndarray) -> np.ndarray:
+        # Lookup table of the query's partial inner products with every centroid.
+        split = self._split(np.asarray(query, dtype=np.float32)[None, :])[:, 0]
+        return np.einsum("md,mcd->mc", split, self.codebooks).astype(np.float32)
+
+    def _score_codes(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Codes are column-major, so each gather reads one contiguous column.
+        out = np.take(tables[0], codes[:, 0])
+        for i in range(1, self.n_subvectors):
+            out += np.take(tables[i], codes[:, i])
+        return out
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            **super().get_params(),
+            "n_subvectors": self.n_subvectors,
+            "n_iter": self.n_iter,
+        }
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {**super().get_state(), "codebooks": self.codebooks}
+
+    def restore(self, state: Dict[str, np.ndarray]) -> None:
+        super().restore(state)
+        self.codebooks = np.array(state["codebooks"])
+
+
+QUANTIZERS = {quantizer.kind: quantizer for quantizer in (ScalarQuantizer, ProductQuantizer)}
+
+
+def quantizer_from_params(params: Dict[str, Any]) -> Quantizer:
+    params = dict(params)
+    return QUANTIZERS[params.pop("kind")](**params)
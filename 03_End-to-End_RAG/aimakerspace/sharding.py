@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import os
+import tempfile
+import weakref
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from aimakerspace.vectordatabase import MatrixStorage, _top_k_indices
+
+# (path, offset, shape, dtype) of a read-only array mapped from a file.
+ArraySpec = Tuple[str, int, Tuple[int, ...], str]
+
+# Arrays already mapped by this (worker) process, keyed by role.
+_MAPPED: Dict[str, Tuple[ArraySpec, np.ndarray]] = {}
+
+
+def _map(role: str, spec: ArraySpec) -> np.ndarray:
+    cached = _MAPPED.get(role)
+    if cached is None or cached[0] != spec:
+        path, offset, shape, dtype = spec
+        _MAPPED[role] = (spec, np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+    return _MAPPED[role][1]
+
+
+def _shard_top_k(
+    matrix: np.ndarray,
+    alive: Optional[np.ndarray],
+    offset: int,
+    queries: np.ndarray,
+    k: int,
+) -> List[List[Tuple[float, int]]]:
+    """Per-query (score, row) top-k of one shard; rows are global."""
+    scores = queries @ matrix.T
+    if alive is not None:
+        scores[:, ~alive] = -np.inf
+    results = []
+    for row_scores in scores:
+        best = _top_k_indices(row_scores, k)
+        best = best[np.isfinite(row_scores[best])]
+        results.append(list(zip(row_scores[best].tolist(), (best + offset).tolist())))
+    return results
+
+
+def _scan_mapped_shard(
+    matrix_spec: ArraySpec,
+    alive_spec: Optional[ArraySpec],
+    start: int,
+    stop: int,
+    queries: np.ndarray,
+    k: int,
+) -> List[List[Tuple[float, int]]]:
+    """Process-pool entry point: scans rows [start, stop) of the mapped snapshot."""
+    matrix = _map("matrix", matrix_spec)[start:stop]
+    alive = _map("alive", alive_spec)[start:stop] if alive_spec is not None else None
+    return _shard_top_k(matrix, alive, start, queries, k)
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ShardedSearcher:
+    """
+    Exact top-k over a `MatrixStorage`, split into `n_shards` contiguous row
+    ranges that are scanned in parallel and merged with a heap.
+
+    With `executor="thread"` the shards are views of the storage matrix and
+    the scan relies on NumPy releasing the GIL inside the matrix product.
+    With `executor="process"` workers memory-map a read-only snapshot of the
+    matrix: the storage's own `.npy` file when it was loaded with
+    `mmap=True` and not modified since, otherwise a copy written once per
+    storage version to shared memory (`/dev/shm` where available).
+    """
+
+    def __init__(
+        self,
+        storage: MatrixStorage,
+        n_shards: Optional[int] = None,
+        executor: str = "thread",
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}. Must be 'thread' or 'process'")
+        self.storage = storage
+        self.n_shards = n_shards or os.cpu_count() or 1
+        self.executor = executor
+        pool_cls = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+        self._pool: Executor = pool_cls(max_workers=self.n_shards)
+        self._snapshot_version: Optional[int] = None
+        self._specs: Tuple[Optional[ArraySpec], Optional[ArraySpec]] = (None, None)
+        self._snapshot_files: List[str] = []
+        self._finalizer = weakref.finalize(self, _remove_files, self._snapshot_files)
+
+    def _bounds(self) -> List[Tuple[int, int]]:
+        edges = np.linspace(0, self.storage.n_rows, self.n_shards + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    @staticmethod
+    def _spec_of(array: np.ndarray) -> Optional[ArraySpec]:
+        """Where `array` already lives on disk, if it is an unmodified file mapping."""
+        if isinstance(array, np.memmap) and array.filename and array.flags.c_contiguous:
+            return (array.filename, array.offset, array.shape, array.dtype.str)
+        return None
+
+    def _write_snapshot(self, array: np.ndarray) -> ArraySpec:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, path = tempfile.mkstemp(prefix="aimakerspace-shard-", suffix=".bin", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+        self._snapshot_files.append(path)
+        return (path, 0, array.shape, array.dtype.str)
+
+    def _snapshot(self) -> Tuple[ArraySpec, Optional[ArraySpec]]:
+        if self._snapshot_version != self.storage.version:
+            _remove_files(self._snapshot_files)
+            self._snapshot_files.clear()
+            matrix = self.storage.matrix
+            matrix_spec = self._spec_of(matrix) or self._write_snapshot(matrix)
+            alive_spec = None
+            if self.storage.n_deleted:
+                alive_spec = self._write_snapshot(self.storage.alive)
+            self._specs = (matrix_spec, alive_spec)
+            self._snapshot_version = self.storage.version
+        return self._specs
+
+    def top_k_many(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """
+        :param queries: (n, d) unit-normalized float32 query matrix
+        :return: Per query, the k best (key, score) pairs
+        """
+        if not len(self.storage):
+            return [[] for _ in range(queries.shape[0])]
+        bounds = self._bounds()
+        if self.executor == "thread":
+            matrix = self.storage.matrix
+            alive = self.storage.alive if self.storage.n_deleted else None
+            futures = [
+                self._pool.submit(
+                    _shard_top_k,
+                    matrix[start:stop],
+                    None if alive is None else alive[start:stop],
+                    start,
+                    queries,
+                    k,
+                )
+                for start, stop in bounds
+            ]
+        else:
+            matrix_spec, alive_spec = self._snapshot()
+            futures = [
+                self._pool.submit(
+                    _scan_mapped_shard, matrix_spec, alive_spec, start, stop, queries, k
+                )
+                for start, stop in bounds
+            ]
+
+        per_shard = [future.result() for future in futures]
+        keys = self.storage.keys
+        return [
+            [
+                (keys[row], score)
+                for score, row in heapq.nlargest(
+                    k, itertools.chain.from_iterable(shard[i] for shard in per_shard)
+                )
+            ]
+            for i in range(queries.shape[0])
+        ]
+
+    def close(self) -> None:
+        self._pool.shutdown()
+        self._finalizer()
+
+    def __enter__(self) -> "ShardedSearcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,5 +1,9 @@
 import os
-from typing import List
+import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import PyPDF2
 
 
@@ -20,22 +24,81 @@ class TextFileLoader:
             )
 
     def load_file(self):
-        with open(self.path, "r", encoding=self.encoding) as f:
-            self.documents.append(f.read())
+        self.documents.append(self._read(self.path))
 
     def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".txt"):
-                    with open(
-                        os.path.join(root, file), "r", encoding=self.encoding
-                    ) as f:
-                        self.documents.append(f.read())
+        self.documents.extend(self._read(path) for path in self._iter_paths())
 
     def load_documents(self):
         self.load()
         return self.documents
 
+    def iter_documents(self) -> Iterator[str]:
+        """
+        Yields documents one at a time without keeping them in `self.documents`,
+        so only the file currently being processed is held in memory.
+        """
+        if os.path.isdir(self.path):
+            for path in self._iter_paths():
+                yield self._read(path)
+        elif os.path.isfile(self.path) and self.path.endswith(".txt"):
+            yield self._read(self.path)
+        else:
+            raise ValueError(
+                "Provided path is neither a valid directory nor a .txt file."
+            )
+
+    def _iter_paths(self) -> Iterator[str]:
+        for root, _, files in os.walk(self.path):
+            for file in files:
+                if file.endswith(".txt"):
+                    yield os.path.join(root, file)
+
+    def _read(self, path: str) -> str:
+        with open(path, "r", encoding=self.encoding) as f:
+            return f.read()
+
+
+class ChunkSpans:
+    """
+    Chunks stored as `(doc_id, start, end)` offsets into their source documents.
+
+    The offsets live in three compact NumPy arrays (20 bytes per chunk) and
+    the documents are held once, so overlapping chunks do not duplicate text.
+    A chunk's string is only sliced out when it is indexed or iterated, e.g.
+    right before it is sent to the embedder.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[str],
+        doc_ids: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+    ):
+        self.documents = documents
+        self.doc_ids = doc_ids
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return self.doc_ids.shape[0]
+
+    def __getitem__(self, i: int) -> str:
+        return self.documents[self.doc_ids[i]][self.starts[i] : self.ends[i]]
+
+    def __iter__(self) -> Iterator[str]:
+        for doc_id, start, end in zip(
+            self.doc_ids.tolist(), self.starts.tolist(), self.ends.tolist()
+        ):
+            yield self.documents[doc_id][start:end]
+
+    def texts(self, indices: Optional[Iterable[int]] = None) -> List[str]:
+        """Materializes all chunks, or only those at `indices`."""
+        if indices is None:
+            return list(self)
+        return [self[i] for i in indices]
+
 
 class CharacterTextSplitter:
     def __init__(
@@ -62,11 +125,168 @@ class CharacterTextSplitter:
             chunks.extend(self.split(text))
         return chunks
 
+    def split_spans(self, texts: Sequence[str]) -> ChunkSpans:
+        """
+        Same chunks as `split_texts`, returned as offsets into `texts`
+        instead of copies of the text.
+        """
+        step = self.chunk_size - self.chunk_overlap
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        counts = -(-lengths // step)  # ceil division; empty documents yield no chunks
+        doc_ids = np.repeat(np.arange(len(texts), dtype=np.int32), counts)
+        # Position of every chunk within its own document.
+        first = np.cumsum(counts) - counts
+        positions = np.arange(doc_ids.shape[0], dtype=np.int64) - np.repeat(first, counts)
+        starts = positions * step
+        ends = np.minimum(starts + self.chunk_size, lengths[doc_ids])
+        return ChunkSpans(texts, doc_ids, starts, ends)
+
+    def iter_chunks(self, texts: Iterable[str]) -> Iterator[str]:
+        """Lazily splits a stream of documents, e.g. `TextFileLoader.iter_documents()`."""
+        for text in texts:
+            for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
+                yield text[i : i + self.chunk_size]
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    """tiktoken encoder for `model_name`, built once per process."""
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class TokenTextSplitter:
+    """
+    Splits documents into chunks of at most `chunk_size` tokens, cutting at
+    the coarsest boundary available (paragraph, line, sentence, word).
+
+    Each document is tokenized once; boundaries are located in the text and
+    mapped onto token positions, so chunk sizes are measured exactly without
+    re-encoding candidate pieces.
+    """
+
+    # Boundaries fall at the end of each match, in order of preference.
+    separators = (
+        re.compile(r"\n\s*\n"),
+        re.compile(r"\n"),
+        re.compile(r"[.!?](?=\s)"),
+        re.compile(r"\S(?=\s)"),
+    )
+
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        model_name: str = "gpt-4o",
+    ):
+        """
+        :param chunk_size: Maximum tokens per chunk
+        :param chunk_overlap: Tokens repeated at the start of the next chunk
+        :param model_name: Model whose tokenizer measures the chunks
+        """
+        assert (
+            chunk_size > chunk_overlap
+        ), "Chunk size must be greater than chunk overlap"
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.model_name = model_name
+
+    def _boundaries(self, text: str, offsets: np.ndarray) -> List[np.ndarray]:
+        """Token positions at which each separator allows a cut, one array per separator."""
+        return [
+            np.unique(
+                np.searchsorted(
+                    offsets,
+                    np.fromiter((m.end() for m in pattern.finditer(text)), dtype=np.int64),
+                )
+            )
+            for pattern in self.separators
+        ]
+
+    def split(self, text: str) -> List[str]:
+        encoding = _get_encoding(self.model_name)
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= self.chunk_size:
+            return [text] if text.strip() else []
+
+        decoded, starts = encoding.decode_with_offsets(tokens)
+        # offsets[i] is where token i starts; the extra entry closes the last token.
+        offsets = np.append(np.asarray(starts, dtype=np.int64), len(decoded))
+        boundaries = self._boundaries(decoded, offsets)
+
+        chunks = []
+        start, n_tokens = 0, len(tokens)
+        while start < n_tokens:
+            end = min(start + self.chunk_size, n_tokens)
+            if end < n_tokens:
+                # Prefer a cut that keeps the chunk at least half full.
+                lowest = start + max(self.chunk_overlap + 1, self.chunk_size // 2)
+                for cuts in boundaries:
+                    i = np.searchsorted(cuts, end, side="right") - 1
+                    if i >= 0 and cuts[i] >= lowest:
+                        end = int(cuts[i])
+                        break
+            chunk = decoded[offsets[start] : offsets[end]]
+            if chunk.strip():
+                chunks.append(chunk)
+            if end == n_tokens:
+                break
+            start = max(end - self.chunk_overlap, start + 1)
+            if self.chunk_overlap:
+                # Start the overlap on a word rather than mid-word.
+                words = boundaries[-1]
+                i = np.searchsorted(words, start)
+                if i < len(words) and words[i] < end:
+                    start = int(words[i])
+        return chunks
+
+    def split_texts(self, texts: List[str]) -> List[str]:
+        chunks = []
+        for text in texts:
+            chunks.extend(self.split(text))
+        return chunks
+
+    def iter_chunks(self, texts: Iterable[str]) -> Iterator[str]:
+        for text in texts:
+            yield from self.split(text)
+
+
+def _extract_pdf_text(path: str, start: int = 0, stop: Optional[int] = None) -> str:
+    """Text of pages [start, stop) of a PDF, one line break after each page."""
+    with open(path, "rb") as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        pages = pdf_reader.pages[start:stop]
+        return "".join([page.extract_text() + "\n" for page in pages])
+
+
+def _count_pdf_pages(path: str) -> int:
+    with open(path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
 
 class PDFLoader:
-    def __init__(self, path: str):
+    def __init__(
+        self,
+        path: str,
+        max_workers: Optional[int] = None,
+        pages_per_task: Optional[int] = None,
+    ):
+        """
+        :param path: A PDF file or a directory searched recursively for PDFs
+        :param max_workers: Processes used by `load_directory`/`iter_documents`;
+            1 extracts in the calling process
+        :param pages_per_task: If set, PDFs longer than this are split into page
+            ranges extracted in parallel and reassembled in order
+        """
         self.documents = []
         self.path = path
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
         print(f"PDFLoader initialized with path: {self.path}")
 
     def load(self):
@@ -90,36 +310,70 @@ class PDFLoader:
             raise ValueError(f"Error processing file at '{self.path}': {str(e)}")
 
     def load_file(self):
-        with open(self.path, 'rb') as file:
-            # Create PDF reader object
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from each page
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            self.documents.append(text)
+        self.documents.append(_extract_pdf_text(self.path))
 
     def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.lower().endswith('.pdf'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        
-                        # Extract text from each page
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                        
-                        self.documents.append(text)
+        self.documents.extend(self.iter_documents(ordered=True))
 
     def load_documents(self):
         self.load()
         return self.documents
 
+    def iter_documents(self, ordered: bool = False) -> Iterator[str]:
+        """
+        Extracts every PDF under `path` in a process pool and yields each
+        document's text as soon as all of its pages are done.
+
+        :param ordered: Yield documents in directory-walk order instead of completion order
+        """
+        paths = self._pdf_paths()
+        if self.max_workers == 1 or (len(paths) <= 1 and not self.pages_per_task):
+            for path in paths:
+                yield _extract_pdf_text(path)
+            return
+
+        parts: Dict[str, List[Optional[str]]] = {}
+        pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            # Page counts need each PDF parsed, so they are taken in the pool too.
+            page_counts = (
+                list(pool.map(_count_pdf_pages, paths)) if self.pages_per_task else None
+            )
+            futures = {}
+            for path, part, start, stop in self._tasks(paths, page_counts):
+                parts.setdefault(path, []).append(None)
+                futures[pool.submit(_extract_pdf_text, path, start, stop)] = (path, part)
+            for future in futures if ordered else as_completed(futures):
+                path, part = futures[future]
+                parts[path][part] = future.result()
+                if all(text is not None for text in parts[path]):
+                    yield "".join(parts.pop(path))
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _pdf_paths(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return [self.path]
+        return [
+            os.path.join(root, file)
+            for root, _, files in os.walk(self.path)
+            for file in files
+            if file.lower().endswith(".pdf")
+        ]
+
+    def _tasks(
+        self, paths: List[str], page_counts: Optional[List[int]] = None
+    ) -> List[Tuple[str, int, int, Optional[int]]]:
+        """(path, part, first page, stop page) work items, parts numbered per file."""
+        if page_counts is None:
+            return [(path, 0, 0, None) for path in paths]
+        tasks = []
+        for path, n_pages in zip(paths, page_counts):
+            starts = range(0, n_pages, self.pages_per_task) or [0]
+            for part, start in enumerate(starts):
+                tasks.append((path, part, start, start + self.pages_per_task))
+        return tasks
+
 
 if __name__ == "__main__":
     loader = TextFileLoader("data/KingLear.txt")
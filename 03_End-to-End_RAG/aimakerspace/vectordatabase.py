@@ -1,8 +1,16 @@
 import numpy as np
-from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Callable, Union
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.bm25 import BM25Index, reciprocal_rank_fusion
+from aimakerspace.index import IVFIndex
+from aimakerspace.metadata import MetadataStore
+from aimakerspace.quantization import Quantizer, quantizer_from_params
 import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
 
 
 def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
@@ -13,23 +21,555 @@ def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def _normalize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (unit-length rows, original norms); zero vectors are left as-is."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    safe_norms = np.where(norms == 0, 1, norms)
+    return vectors / safe_norms, norms.squeeze(-1)
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, without a full sort."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _write_atomic(path: str, write: Callable) -> None:
+    """Writes `path` through a temporary file, so readers (and memory maps) of the old file are unaffected."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class MatrixStorage:
+    """
+    Keeps every vector as a row of one contiguous, growable float32 matrix.
+
+    Rows are stored unit-normalized so cosine similarity against the whole
+    corpus is a single matrix-vector product. The original norms are kept
+    alongside so the raw vectors can still be reconstructed, `keys` is the
+    parallel array of chunk texts and `ids` the parallel array of stable
+    integer ids. Deleted rows are tombstoned and only dropped by `compact`.
+
+    After `spill(path)` the matrix lives in a memory-mapped file instead of
+    the heap, so the OS can page it out; writes still go through the map.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self.spill_path: Optional[str] = None
+        self.keys: List[str] = []
+        self._key_to_row: Dict[str, int] = {}
+        self._id_to_row: Dict[int, int] = {}
+        self._next_id = 0
+        self._n_deleted = 0
+        # Bumped on every write, so readers can tell when a snapshot is stale.
+        self.version = 0
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.keys) - self._n_deleted
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_to_row
+
+    @property
+    def n_rows(self) -> int:
+        """Number of physical rows, tombstoned ones included."""
+        return len(self.keys)
+
+    @property
+    def n_deleted(self) -> int:
+        return self._n_deleted
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the populated, unit-normalized rows."""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[: self.n_rows]
+
+    @property
+    def norms(self) -> np.ndarray:
+        """Original norms of the populated rows."""
+        if self._norms is None:
+            return np.empty(0, dtype=np.float32)
+        return self._norms[: self.n_rows]
+
+    @property
+    def ids(self) -> np.ndarray:
+        if self._ids is None:
+            return np.empty(0, dtype=np.int64)
+        return self._ids[: self.n_rows]
+
+    @property
+    def alive(self) -> np.ndarray:
+        if self._alive is None:
+            return np.empty(0, dtype=bool)
+        return self._alive[: self.n_rows]
+
+    @classmethod
+    def from_arrays(
+        cls,
+        keys: List[str],
+        matrix: np.ndarray,
+        norms: np.ndarray,
+        ids: Optional[np.ndarray] = None,
+        next_id: Optional[int] = None,
+    ) -> "MatrixStorage":
+        """
+        Wraps existing (possibly memory-mapped) arrays without copying them.
+
+        The arrays are only copied into process memory on the first write.
+        """
+        storage = cls(dim=matrix.shape[1])
+        storage.keys = list(keys)
+        storage._key_to_row = {key: row for row, key in enumerate(storage.keys)}
+        storage._matrix, storage._norms = matrix, norms
+        storage._ids = np.arange(len(keys), dtype=np.int64) if ids is None else np.array(ids)
+        storage._id_to_row = {int(id_): row for row, id_ in enumerate(storage._ids)}
+        storage._alive = np.ones(len(keys), dtype=bool)
+        storage._next_id = int(storage._ids.max()) + 1 if len(keys) else 0
+        if next_id is not None:
+            storage._next_id = max(storage._next_id, next_id)
+        return storage
+
+    @property
+    def nbytes(self) -> int:
+        if self._matrix is None:
+            return 0
+        return self._matrix.nbytes + self._norms.nbytes + self._ids.nbytes + self._alive.nbytes
+
+    def _new_matrix(self, rows: np.ndarray, capacity: int) -> np.ndarray:
+        """A matrix of `capacity` rows starting with `rows`, in the heap or the spill file."""
+        if self.spill_path is None:
+            matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            matrix[: rows.shape[0]] = rows
+            return matrix
+        # Written aside and swapped in, as `rows` may be a map of the current file.
+        tmp_path = self.spill_path + ".tmp"
+        matrix = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+        matrix[: rows.shape[0]] = rows
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, self.spill_path)
+        # Reopened so the map's `filename` (used by process shards) is the final path.
+        return np.load(self.spill_path, mmap_mode="r+")
+
+    def spill(self, path: str) -> None:
+        """Moves the matrix (and every later growth of it) into a memory-mapped file at `path`."""
+        self.spill_path = path
+        if self._matrix is not None:
+            self._matrix = self._new_matrix(self.matrix, self._matrix.shape[0])
+
+    def _reserve(self, size: int) -> None:
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if size <= capacity and self._matrix.flags.writeable:
+            return
+        new_capacity = max(size, capacity * 2, self._initial_capacity)
+        matrix = self._new_matrix(self.matrix, new_capacity)
+        norms = np.empty(new_capacity, dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._matrix is not None:
+            norms[: self.n_rows] = self.norms
+            ids[: self.n_rows] = self.ids
+            alive[: self.n_rows] = self.alive
+        self._matrix, self._norms, self._ids, self._alive = matrix, norms, ids, alive
+
+    def _check_dim(self, dim: int) -> None:
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {dim}")
+
+    def _rows_for(self, keys: List[str]) -> np.ndarray:
+        """Resolves (and allocates, with a fresh id, for new keys) the row of each key."""
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self._key_to_row.get(key)
+            if row is None:
+                row = self.n_rows
+                self._key_to_row[key] = row
+                self.keys.append(key)
+                self._ids[row] = self._next_id
+                self._alive[row] = True
+                self._id_to_row[self._next_id] = row
+                self._next_id += 1
+            rows[i] = row
+        return rows
+
+    def add(self, key: str, vector: np.array) -> int:
+        return int(self.add_many([key], [vector])[0])
+
+    def add_many(self, keys: List[str], vectors) -> np.ndarray:
+        """Writes the vectors, overwriting existing keys in place; returns their rows."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(keys):
+            raise ValueError("Expected one vector per key")
+        self._check_dim(vectors.shape[1])
+        self._reserve(self.n_rows + len(keys))
+        rows = self._rows_for(keys)
+        normalized, norms = _normalize(vectors)
+        # Duplicate keys within a batch resolve to the last occurrence.
+        self._matrix[rows] = normalized
+        self._norms[rows] = norms
+        self.version += 1
+        return rows
+
+    def delete(self, ids: Iterable[int]) -> np.ndarray:
+        """Tombstones the rows of the given ids; returns the rows that were deleted."""
+        rows = []
+        for id_ in ids:
+            row = self._id_to_row.pop(int(id_), None)
+            if row is None:
+                continue
+            del self._key_to_row[self.keys[row]]
+            self._alive[row] = False
+            rows.append(row)
+        self._n_deleted += len(rows)
+        self.version += 1
+        return np.array(rows, dtype=np.int64)
+
+    def compact(self) -> np.ndarray:
+        """
+        Rewrites the arrays without tombstoned rows.
+
+        :return: The surviving old rows, in their new order (new row i was old row kept[i])
+        """
+        kept = np.flatnonzero(self.alive)
+        self._matrix = self._new_matrix(self.matrix[kept], len(kept))
+        self._norms = np.array(self.norms[kept], dtype=np.float32)
+        self._ids = self.ids[kept]
+        self.keys = [self.keys[row] for row in kept]
+        self._alive = np.ones(len(kept), dtype=bool)
+        self._key_to_row = {key: row for row, key in enumerate(self.keys)}
+        self._id_to_row = {int(id_): row for row, id_ in enumerate(self._ids)}
+        self._n_deleted = 0
+        self.version += 1
+        return kept
+
+    def row_of(self, key: str) -> Optional[int]:
+        return self._key_to_row.get(key)
+
+    def id_of(self, key: str) -> Optional[int]:
+        row = self._key_to_row.get(key)
+        return None if row is None else int(self._ids[row])
+
+    def key_of(self, id_: int) -> Optional[str]:
+        row = self._id_to_row.get(id_)
+        return None if row is None else self.keys[row]
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._key_to_row.get(key)
+        if row is None:
+            return None
+        return self._matrix[row] * self._norms[row]
+
+    def live_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Drops tombstoned rows from `rows`."""
+        if not self._n_deleted:
+            return rows
+        return rows[self._alive[rows]]
+
+    def scores(self, query_vector: np.array, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query, _ = _normalize(query)
+        if rows is None:
+            return self.matrix @ query
+        return self._matrix[rows] @ query
+
+    def _select(
+        self, scores: np.ndarray, k: int, rows: Optional[np.ndarray]
+    ) -> List[Tuple[str, float]]:
+        if rows is None:
+            rows = np.arange(self.n_rows)
+            if self._n_deleted:
+                scores = np.where(self.alive, scores, -np.inf)
+                k = min(k, len(self))
+        return [(self.keys[rows[i]], float(scores[i])) for i in _top_k_indices(scores, k)]
+
+    def top_k(
+        self, query_vector: np.array, k: int, rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        """Top-k over the whole corpus, or only over `rows` when given."""
+        if not len(self):
+            return []
+        if rows is not None:
+            rows = self.live_rows(rows)
+        return self._select(self.scores(query_vector, rows), k, rows)
+
+    def top_k_many(
+        self, query_vectors, k: int, rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Scores every query against the corpus (or `rows`) with one matrix-matrix product."""
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if not len(self):
+            return [[] for _ in range(queries.shape[0])]
+        queries, _ = _normalize(queries)
+        if rows is None:
+            scores = queries @ self.matrix.T
+        else:
+            rows = self.live_rows(rows)
+            scores = queries @ self._matrix[rows].T
+        return [self._select(row_scores, k, rows) for row_scores in scores]
+
+
 class VectorDatabase:
-    def __init__(self, embedding_model: EmbeddingModel = None):
-        self.vectors = defaultdict(np.array)
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel = None,
+        index: Optional[IVFIndex] = None,
+        quantizer: Optional[Quantizer] = None,
+        indexed_fields: Optional[Iterable[str]] = None,
+        compact_threshold: float = 0.25,
+        n_shards: int = 1,
+        shard_executor: str = "thread",
+        lexical: bool = False,
+        spill_path: Optional[str] = None,
+    ):
+        """
+        :param embedding_model: Model used to embed texts and queries
+        :param index: Optional approximate index; exact search is used when omitted
+        :param quantizer: Optional compressed codes (`ScalarQuantizer`, `ProductQuantizer`)
+            scanned instead of the float32 rows. The scan reads far fewer bytes but does
+            more work per byte, so it is only moderately faster than the float32 scan;
+            the main gain is memory. The float32 rows are still kept, to
+            re-rank candidates, and by default stay in the heap next to the codes, so
+            quantization alone adds memory; pass `spill_path` (or load with `mmap=True`)
+            to keep them out of the heap
+        :param indexed_fields: Metadata fields that get an inverted index for `filter=`
+        :param compact_threshold: Fraction of deleted rows at which `delete` compacts
+        :param n_shards: Split exact scans into this many row shards searched in parallel
+        :param shard_executor: "thread" or "process" pool for the shards (see `ShardedSearcher`)
+        :param lexical: Also maintain a BM25 index over the keys, for `search_lexical`
+            and `search_hybrid`
+        :param spill_path: File the float32 rows are moved to, memory-mapped, once the
+            quantizer is trained, so only the codes need to stay resident
+        """
+        self.storage = MatrixStorage()
+        self.metadata = MetadataStore(indexed_fields)
         self.embedding_model = embedding_model or EmbeddingModel()
+        self.index = index
+        self.quantizer = quantizer
+        self.compact_threshold = compact_threshold
+        self.n_shards = n_shards
+        self.shard_executor = shard_executor
+        self._searcher = None
+        self.bm25 = BM25Index() if lexical else None
+        self.spill_path = spill_path
+
+    def __len__(self) -> int:
+        return len(self.storage)
+
+    def close(self) -> None:
+        """Shuts down the shard worker pool, if one was started."""
+        if self._searcher is not None:
+            self._searcher.close()
+            self._searcher = None
+
+    def __enter__(self) -> "VectorDatabase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _exact_top_k_many(self, query_vectors, k: int) -> List[List[Tuple[str, float]]]:
+        if self.n_shards <= 1:
+            return self.storage.top_k_many(query_vectors, k)
+        if self._searcher is None or self._searcher.storage is not self.storage:
+            from aimakerspace.sharding import ShardedSearcher
+
+            self.close()
+            self._searcher = ShardedSearcher(self.storage, self.n_shards, self.shard_executor)
+        queries, _ = _normalize(np.asarray(query_vectors, dtype=np.float32))
+        return self._searcher.top_k_many(queries, k)
+
+    def _exact_top_k(self, query_vector: np.array, k: int) -> List[Tuple[str, float]]:
+        if self.n_shards <= 1:
+            return self.storage.top_k(query_vector, k)
+        return self._exact_top_k_many([query_vector], k)[0]
+
+    @property
+    def vectors(self) -> Dict[str, np.array]:
+        """Key -> vector mapping, materialized from the backing matrix."""
+        return {key: self.storage.get(key) for key in self._live_keys()}
+
+    def _live_keys(self) -> List[str]:
+        keys = self.storage.keys
+        return [keys[row] for row in np.flatnonzero(self.storage.alive).tolist()]
+
+    def insert(
+        self, key: str, vector: np.array, metadata: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Inserts a vector and returns its id. An existing `key` is overwritten
+        in place and keeps its id; use `upsert` to make that explicit in bulk.
+        """
+        return self.upsert([key], [vector], [metadata])[0]
+
+    def upsert(
+        self,
+        keys: List[str],
+        vectors,
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[int]:
+        """
+        Inserts new keys and overwrites existing ones (vector and metadata) in place.
 
-    def insert(self, key: str, vector: np.array) -> None:
-        self.vectors[key] = vector
+        :return: The stable id of every key; existing keys keep theirs
+        """
+        if not keys:
+            return []
+        rows = self._add_many(keys, vectors, metadatas)
+        return self.storage.ids[rows].tolist()
+
+    def _add_many(
+        self,
+        keys: List[str],
+        vectors,
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> np.ndarray:
+        first_new_row = self.storage.n_rows
+        rows = self.storage.add_many(keys, vectors)
+        if self.bm25 is not None:
+            # Keys are the texts, so only newly created rows need indexing.
+            for row in np.unique(rows[rows >= first_new_row]).tolist():
+                self.bm25.add(row, self.storage.keys[row])
+        for row, metadata in zip(rows.tolist(), metadatas or [None] * len(keys)):
+            self.metadata.set(row, metadata)
+        for component in (self.index, self.quantizer):
+            if component is not None:
+                component.add(rows, self.storage.matrix[rows])
+        return rows
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """
+        Tombstones the given ids; unknown ids are ignored.
+
+        Deleted rows are skipped by every search path immediately, but their
+        storage is only reclaimed by `compact` (run automatically once the
+        deleted fraction reaches `compact_threshold`).
+
+        :return: Number of vectors deleted
+        """
+        rows = self.storage.delete(ids)
+        for row in rows.tolist():
+            self.metadata.set(row, None)
+            if self.bm25 is not None:
+                self.bm25.remove(row, self.storage.keys[row])
+        if self.storage.n_rows and (
+            self.storage.n_deleted / self.storage.n_rows >= self.compact_threshold
+        ):
+            self.compact()
+        return len(rows)
+
+    def compact(self) -> None:
+        """Rewrites storage, metadata, index lists and codes without tombstoned rows."""
+        if not self.storage.n_deleted:
+            return
+        kept = self.storage.compact()
+        self.metadata.take(kept)
+        for component in (self.index, self.quantizer, self.bm25):
+            if component is not None:
+                component.take(kept)
+
+    def get_id(self, key: str) -> Optional[int]:
+        return self.storage.id_of(key)
+
+    def get_key(self, id_: int) -> Optional[str]:
+        return self.storage.key_of(id_)
+
+    def _ready(self, component) -> bool:
+        """Lazily trains an index or quantizer once the corpus is large enough to benefit."""
+        if component is None:
+            return False
+        if not component.is_trained and len(self.storage) >= component.min_train_size:
+            component.build(self.storage.matrix)
+        return component.is_trained
+
+    def _index_ready(self) -> bool:
+        return self._ready(self.index)
+
+    def _quantizer_ready(self) -> bool:
+        ready = self._ready(self.quantizer)
+        if ready and self.spill_path is not None and self.storage.spill_path is None:
+            self.storage.spill(self.spill_path)
+        return ready
+
+    def _is_approximate(self) -> bool:
+        # Evaluate both so either component gets trained.
+        return self._index_ready() | self._quantizer_ready()
+
+    def _quantized_top_k(
+        self, query: np.ndarray, k: int, rows: Optional[np.ndarray], rerank: bool
+    ) -> List[Tuple[str, float]]:
+        if rows is not None:
+            rows = self.storage.live_rows(rows)
+        scores = self.quantizer.scores(query, rows)
+        if rows is None and self.storage.n_deleted:
+            scores = np.where(self.storage.alive, scores, -np.inf)
+        rerank = rerank and self.quantizer.rerank_factor > 0
+        best = _top_k_indices(scores, k * self.quantizer.rerank_factor if rerank else k)
+        best = best[np.isfinite(scores[best])]
+        candidates = best if rows is None else rows[best]
+        if rerank:
+            return self.storage.top_k(query, k, candidates)
+        return [
+            (self.storage.keys[row], float(score))
+            for row, score in zip(candidates, scores[best])
+        ]
 
     def search(
         self,
         query_vector: np.array,
         k: int,
         distance_measure: Callable = cosine_similarity,
+        exact: bool = False,
+        n_probe: Optional[int] = None,
+        rerank: bool = True,
+        filter: Optional[Dict[str, Any]] = None,
     ) -> List[Tuple[str, float]]:
+        """
+        :param filter: Metadata conditions (see `MetadataStore.filter_rows`); matching rows
+            are selected first and scored exactly, so the cost follows the subset size
+        """
+        rows = None
+        if filter is not None:
+            rows = self.metadata.filter_rows(filter)
+            if distance_measure is cosine_similarity:
+                return self.storage.top_k(query_vector, k, rows)
+
+        if distance_measure is cosine_similarity:
+            if exact or not self._is_approximate():
+                return self._exact_top_k(query_vector, k)
+            query, _ = _normalize(np.asarray(query_vector, dtype=np.float32))
+            rows = self.index.candidates(query, n_probe) if self._index_ready() else None
+            if self._quantizer_ready():
+                return self._quantized_top_k(query, k, rows, rerank)
+            return self.storage.top_k(query, k, rows)
+
+        if rows is None:
+            keys = self._live_keys()
+        else:
+            # Deleted rows have None metadata, which a filter on None would match.
+            keys = [self.storage.keys[row] for row in self.storage.live_rows(rows).tolist()]
         scores = [
-            (key, distance_measure(query_vector, vector))
-            for key, vector in self.vectors.items()
+            (key, distance_measure(query_vector, self.storage.get(key)))
+            for key in keys
         ]
         return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
 
@@ -39,18 +579,404 @@ class VectorDatabase:
         k: int,
         distance_measure: Callable = cosine_similarity,
         return_as_text: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
     ) -> List[Tuple[str, float]]:
         query_vector = self.embedding_model.get_embedding(query_text)
-        results = self.search(query_vector, k, distance_measure)
+        results = self.search(query_vector, k, distance_measure, filter=filter)
         return [result[0] for result in results] if return_as_text else results
 
+    def search_mmr(
+        self,
+        query_vector: np.array,
+        k: int,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Maximal marginal relevance: re-ranks the `fetch_k` nearest vectors for diversity.
+
+        Each step picks the candidate maximizing
+        ``lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, selected)``,
+        using one candidate-candidate similarity matrix computed up front.
+
+        :param lambda_mult: 1 ranks purely by relevance, 0 purely by diversity
+        :return: (key, similarity to the query) pairs in selection order
+        """
+        if k <= 0:
+            return []
+        candidates = self.search(query_vector, max(k, fetch_k), filter=filter)
+        if not candidates:
+            return []
+        rows = np.array([self.storage.row_of(key) for key, _ in candidates], dtype=np.int64)
+        vectors = self.storage.matrix[rows]
+        query, _ = _normalize(np.asarray(query_vector, dtype=np.float32))
+        query_similarity = vectors @ query
+        pairwise_similarity = vectors @ vectors.T
+
+        selected = [int(np.argmax(query_similarity))]
+        redundancy = pairwise_similarity[selected[0]].copy()
+        while len(selected) < min(k, len(rows)):
+            mmr = lambda_mult * query_similarity - (1 - lambda_mult) * redundancy
+            mmr[selected] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            np.maximum(redundancy, pairwise_similarity[best], out=redundancy)
+
+        return [(candidates[i][0], float(query_similarity[i])) for i in selected]
+
+    def search_mmr_by_text(
+        self,
+        query_text: str,
+        k: int,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        return_as_text: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        query_vector = self.embedding_model.get_embedding(query_text)
+        results = self.search_mmr(query_vector, k, fetch_k, lambda_mult, filter=filter)
+        return [result[0] for result in results] if return_as_text else results
+
+    def search_lexical(
+        self,
+        query_text: str,
+        k: int,
+        return_as_text: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        """BM25 keyword search; needs `lexical=True` and makes no embedding call."""
+        if self.bm25 is None:
+            raise ValueError("Lexical search requires VectorDatabase(lexical=True)")
+        alive = self.storage.alive if self.storage.n_deleted else None
+        rows, scores = self.bm25.scores(query_text, alive)
+        if filter is not None:
+            keep = np.isin(rows, self.metadata.filter_rows(filter), assume_unique=True)
+            rows, scores = rows[keep], scores[keep]
+        results = [
+            (self.storage.keys[rows[i]], float(scores[i])) for i in _top_k_indices(scores, k)
+        ]
+        return [result[0] for result in results] if return_as_text else results
+
+    def search_hybrid(
+        self,
+        query_text: str,
+        k: int,
+        fetch_k: int = 50,
+        rrf_k: int = 60,
+        return_as_text: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Fuses dense and BM25 rankings with reciprocal rank fusion.
+
+        :param fetch_k: Candidates taken from each ranking before fusion
+        :param rrf_k: Reciprocal rank fusion damping constant
+        :return: (key, fused score) pairs, best first
+        """
+        dense = self.search_by_text(query_text, fetch_k, return_as_text=True, filter=filter)
+        sparse = self.search_lexical(query_text, fetch_k, return_as_text=True, filter=filter)
+        results = reciprocal_rank_fusion([dense, sparse], k=rrf_k)[:k]
+        return [result[0] for result in results] if return_as_text else results
+
+    def search_many(
+        self,
+        query_vectors: List[np.array],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        if len(query_vectors) == 0:
+            return []
+        if filter is not None:
+            return self.storage.top_k_many(query_vectors, k, self.metadata.filter_rows(filter))
+        if self._is_approximate():
+            return [self.search(query_vector, k) for query_vector in query_vectors]
+        return self._exact_top_k_many(query_vectors, k)
+
+    def recall_report(
+        self,
+        query_vectors: List[np.array],
+        k: int = 10,
+        n_probe: Optional[int] = None,
+        rerank: bool = True,
+    ) -> Dict[str, float]:
+        """
+        Compares the approximate path (index and/or quantizer) against exact search.
+
+        :return: recall@k and mean per-query latency (ms) of both paths
+        """
+        if not self._is_approximate():
+            raise ValueError("No trained index or quantizer to evaluate; exact search is in use")
+
+        start = time.perf_counter()
+        exact = [self.search(query, k, exact=True) for query in query_vectors]
+        exact_ms = (time.perf_counter() - start) * 1000 / len(query_vectors)
+
+        start = time.perf_counter()
+        approx = [
+            self.search(query, k, n_probe=n_probe, rerank=rerank) for query in query_vectors
+        ]
+        approx_ms = (time.perf_counter() - start) * 1000 / len(query_vectors)
+
+        hits = sum(
+            len({key for key, _ in truth} & {key for key, _ in found})
+            for truth, found in zip(exact, approx)
+        )
+        expected = sum(len(truth) for truth in exact)
+        return {
+            f"recall@{k}": hits / expected if expected else 1.0,
+            "exact_ms": exact_ms,
+            "approx_ms": approx_ms,
+        }
+
+    def search_many_by_text(
+        self,
+        query_texts: List[str],
+        k: int,
+        return_as_text: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        if not query_texts:
+            return []
+        query_vectors = self.embedding_model.get_embeddings(query_texts)
+        return self._format_many(self.search_many(query_vectors, k, filter), return_as_text)
+
+    async def asearch_many_by_text(
+        self,
+        query_texts: List[str],
+        k: int,
+        return_as_text: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        if not query_texts:
+            return []
+        query_vectors = await self.embedding_model.async_get_embeddings(query_texts)
+        return self._format_many(self.search_many(query_vectors, k, filter), return_as_text)
+
+    @staticmethod
+    def _format_many(results: List[List[Tuple[str, float]]], return_as_text: bool):
+        if not return_as_text:
+            return results
+        return [[result[0] for result in query_results] for query_results in results]
+
     def retrieve_from_key(self, key: str) -> np.array:
-        return self.vectors.get(key, None)
+        return self.storage.get(key)
+
+    def get_metadata(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.storage.row_of(key)
+        return None if row is None else self.metadata.get(row)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the database to the directory `path`.
+
+        Vectors and norms are stored as raw `.npy` blocks so `load` can map
+        them straight into memory; keys, metadata payloads (which must be
+        JSON-serializable) and settings go in a JSON sidecar. Pending
+        deletions are compacted first.
+        """
+        self.compact()
+        os.makedirs(path, exist_ok=True)
+        # The arrays may be memory maps of the very files being replaced (after
+        # `load(path)`), so every file is written aside and then swapped in.
+        for name, array in (
+            ("vectors.npy", self.storage.matrix),
+            ("norms.npy", self.storage.norms),
+            ("ids.npy", self.storage.ids),
+        ):
+            _write_atomic(os.path.join(path, name), lambda f, array=array: np.save(f, array))
+
+        index_params = None
+        if self.index is not None:
+            index_params = self.index.get_params()
+            if self.index.is_trained:
+                _write_atomic(
+                    os.path.join(path, "index.npz"),
+                    lambda f: np.savez(
+                        f,
+                        centroids=self.index.centroids,
+                        assignments=self.index.assignments[: self.storage.n_rows],
+                    ),
+                )
+
+        quantizer_params = None
+        if self.quantizer is not None:
+            quantizer_params = self.quantizer.get_params()
+            if self.quantizer.is_trained:
+                _write_atomic(
+                    os.path.join(path, "quantizer.npz"),
+                    lambda f: np.savez(f, **self.quantizer.get_state()),
+                )
+
+        metadata = {
+            "format_version": 1,
+            "dim": self.storage.dim,
+            "count": self.storage.n_rows,
+            "next_id": self.storage._next_id,
+            "embeddings_model_name": getattr(self.embedding_model, "embeddings_model_name", None),
+            "index": index_params,
+            "quantizer": quantizer_params,
+            "metadata": self.metadata.to_dict(),
+            "lexical": self.bm25 is not None,
+            "keys": self.storage.keys,
+        }
+        _write_atomic(
+            os.path.join(path, "metadata.json"),
+            lambda f: f.write(json.dumps(metadata).encode("utf-8")),
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedding_model: EmbeddingModel = None,
+        mmap: bool = True,
+        **kwargs,
+    ) -> "VectorDatabase":
+        """
+        Loads a database written by `save`.
 
-    async def abuild_from_list(self, list_of_text: List[str]) -> "VectorDatabase":
+        :param path: Directory passed to `save`
+        :param embedding_model: Model used for text queries; should match the one used to build
+        :param mmap: Map the vector block read-only instead of reading it, so processes
+            loading the same directory share its pages; it is copied on the first write
+        :param kwargs: Runtime settings forwarded to the constructor, e.g. `n_shards`
+        """
+        with open(os.path.join(path, "metadata.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        mmap_mode = "r" if mmap else None
+        matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        norms = np.load(os.path.join(path, "norms.npy"), mmap_mode=mmap_mode)
+        if matrix.shape[0] != metadata["count"] or (
+            metadata["count"] and matrix.shape[1] != metadata["dim"]
+        ):
+            raise ValueError(f"Vector block in {path} does not match its metadata")
+
+        index = None
+        if metadata["index"] is not None:
+            index = IVFIndex(**metadata["index"])
+            index_path = os.path.join(path, "index.npz")
+            if os.path.exists(index_path):
+                with np.load(index_path) as saved:
+                    index.restore(saved["centroids"], saved["assignments"])
+
+        quantizer = None
+        if metadata.get("quantizer") is not None:
+            quantizer = quantizer_from_params(metadata["quantizer"])
+            quantizer_path = os.path.join(path, "quantizer.npz")
+            if os.path.exists(quantizer_path):
+                with np.load(quantizer_path) as saved:
+                    quantizer.restore(dict(saved))
+
+        database = cls(
+            embedding_model=embedding_model, index=index, quantizer=quantizer, **kwargs
+        )
+        if metadata["count"]:
+            database.storage = MatrixStorage.from_arrays(
+                metadata["keys"],
+                matrix,
+                norms,
+                ids=np.load(os.path.join(path, "ids.npy")),
+                next_id=metadata["next_id"],
+            )
+        if metadata.get("metadata") is not None:
+            database.metadata = MetadataStore.from_dict(metadata["metadata"], metadata["count"])
+        if metadata.get("lexical"):
+            database.bm25 = BM25Index.from_texts(database.storage.keys)
+        return database
+
+    async def abuild_from_iterable(
+        self,
+        items: Iterable[Union[str, Tuple[str, Dict[str, Any]]]],
+        batch_size: int = 256,
+        max_concurrency: int = 4,
+    ) -> "VectorDatabase":
+        """
+        Streams texts (or `(text, metadata)` pairs) into the database.
+
+        The iterable is consumed in a worker thread, so file reading and
+        chunking overlap with up to `max_concurrency` in-flight embedding
+        requests. A bounded queue applies back-pressure, so at most about
+        `2 * max_concurrency` batches are held in memory at once.
+
+        Typical use::
+
+            chunks = splitter.iter_chunks(loader.iter_documents())
+            await vector_db.abuild_from_iterable(chunks)
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+        errors: List[BaseException] = []
+        # Set once the consumers are gone (finished, failed or cancelled), so the
+        # producer thread never blocks on a queue nobody reads any more.
+        stop = threading.Event()
+
+        def put(batch) -> bool:
+            if stop.is_set():
+                return False
+            future = asyncio.run_coroutine_threadsafe(queue.put(batch), loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def produce() -> None:
+            batch = []
+            try:
+                for item in items:
+                    if errors or stop.is_set():
+                        break
+                    batch.append((item, None) if isinstance(item, str) else item)
+                    if len(batch) == batch_size:
+                        if not put(batch):
+                            return
+                        batch = []
+                if batch and not errors:
+                    put(batch)
+            finally:
+                put(None)
+
+        async def consume() -> None:
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    # Pass the end-of-stream marker on to the other consumers.
+                    await queue.put(None)
+                    return
+                if errors:
+                    continue  # keep draining so the producer never blocks
+                texts = [text for text, _ in batch]
+                try:
+                    embeddings = await self.embedding_model.async_get_embeddings(texts)
+                    self._add_many(texts, embeddings, [metadata for _, metadata in batch])
+                except Exception as e:
+                    errors.append(e)
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            await asyncio.gather(*[consume() for _ in range(max_concurrency)])
+            await producer
+        finally:
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
+        if errors:
+            raise errors[0]
+        return self
+
+    async def abuild_from_list(
+        self,
+        list_of_text: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+    ) -> "VectorDatabase":
         embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
-        for text, embedding in zip(list_of_text, embeddings):
-            self.insert(text, np.array(embedding))
+        if list_of_text:
+            self._add_many(list_of_text, embeddings, metadatas)
         return self
 
 
@@ -79,3 +1005,12 @@ if __name__ == "__main__":
         "I think fruit is awesome!", k=k, return_as_text=True
     )
     print(f"Closest {k} text(s):", relevant_texts)
+
+    batched_texts = asyncio.run(
+        vector_db.asearch_many_by_text(
+            ["I think fruit is awesome!", "Which pets are cute?"],
+            k=k,
+            return_as_text=True,
+        )
+    )
+    print(f"Closest {k} text(s) per query:", batched_texts)
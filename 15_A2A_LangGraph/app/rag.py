@@ -26,12 +26,71 @@ from langgraph.graph import START, StateGraph
 from typing_extensions import TypedDict
 
 
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding:
+    """Return the gpt-4o tokenizer, constructed once per process."""
+    return tiktoken.encoding_for_model("gpt-4o")
+
+
+@lru_cache(maxsize=4096)
 def _tiktoken_len(text: str) -> int:
     """Return token length using tiktoken; used for chunk length measurement."""
-    tokens = tiktoken.encoding_for_model("gpt-4o").encode(text)
+    tokens = _get_encoding().encode(text)
     return len(tokens)
 
 
+def _overlap(previous: str, text: str, min_overlap: int = 20) -> int:
+    """Length of the longest suffix of `previous` that is also a prefix of `text`."""
+    probe = text[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = previous.find(probe)
+    while start != -1:
+        if text.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+def _format_context(docs: List[Document], max_tokens: int, separator: str = "\n\n") -> str:
+    """Serialize retrieved documents into a compact, token-budgeted context string.
+
+    Only page content plus file name and page number are kept. Exact and
+    contained duplicates are dropped, and a chunk that starts with the tail
+    of an already kept chunk (splitter overlap) keeps only its new text.
+    Documents are added in retrieval order while they fit within
+    `max_tokens`, separators included.
+    """
+    blocks: List[str] = []
+    texts: List[str] = []
+    used = 0
+    separator_tokens = _tiktoken_len(separator)
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or any(text in previous for previous in texts):
+            continue
+        for previous in texts:
+            shared = _overlap(previous, text)
+            if shared:
+                text = text[shared:].lstrip()
+                break
+        if not text:
+            continue
+        origin = [os.path.basename(str(doc.metadata.get("source", "")))]
+        if doc.metadata.get("page") is not None:
+            origin.append(f"page {doc.metadata['page']}")
+        header = f"[{len(blocks) + 1}] ({', '.join(part for part in origin if part)})"
+        block = f"{header}\n{text}"
+        cost = _tiktoken_len(block) + (separator_tokens if blocks else 0)
+        if used + cost > max_tokens:
+            continue
+        # Only chunks that made it into the context count for deduplication.
+        texts.append(text)
+        blocks.append(block)
+        used += cost
+    return separator.join(blocks)
+
+
 class _RAGState(TypedDict):
     """State schema for the simple two-step RAG graph: retrieve then generate."""
     question: str
@@ -86,6 +145,7 @@ def _build_rag_graph(data_dir: str):
         "Only use the provided context to answer the query. If you do not know the answer, or it's not contained in the provided context respond with \"I don't know\""
     )
     chat_prompt = ChatPromptTemplate.from_messages([("human", human_template)])
+    max_context_tokens = int(os.environ.get("RAG_CONTEXT_TOKENS", "3000"))
     generator_llm = ChatOpenAI(model=os.environ.get("OPENAI_CHAT_MODEL", "gpt-4.1-nano"))
 
     def retrieve(state: _RAGState) -> _RAGState:
@@ -95,7 +155,10 @@ def _build_rag_graph(data_dir: str):
     def generate(state: _RAGState) -> _RAGState:
         generator_chain = chat_prompt | generator_llm | StrOutputParser()
         response_text = generator_chain.invoke(
-            {"query": state["question"], "context": state.get("context", [])}
+            {
+                "query": state["question"],
+                "context": _format_context(state.get("context", []), max_context_tokens),
+            }
         )
         return {"response": response_text}  # type: ignore
 
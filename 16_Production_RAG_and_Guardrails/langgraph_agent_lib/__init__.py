@@ -5,6 +5,7 @@ A library for LangGraph agents with caching, monitoring, and agent integration.
 
 from .agents import create_langgraph_agent
 from .caching import CacheBackedEmbeddings, setup_llm_cache
+from .context import ContextPacker
 from .rag import ProductionRAGChain
 from .models import get_openai_model
 
@@ -13,6 +14,7 @@ __all__ = [
     "create_langgraph_agent",
     "CacheBackedEmbeddings",
     "setup_llm_cache",
+    "ContextPacker",
     "ProductionRAGChain",
     "get_openai_model",
 ]
@@ -0,0 +1,116 @@
+"""Token-budgeted packing of retrieved documents into prompt context."""
+
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import tiktoken
+from langchain_core.documents import Document
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str, model_name: str = "gpt-4o") -> int:
+    """Count tokens in text, cached so repeatedly retrieved chunks are encoded once."""
+    return len(_get_encoding(model_name).encode(text, disallowed_special=()))
+
+
+def _overlap(previous: str, text: str, min_overlap: int) -> int:
+    """Length of the longest suffix of `previous` that is also a prefix of `text`."""
+    probe = text[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = previous.find(probe)
+    while start != -1:
+        if text.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+class ContextPacker:
+    """Serializes retrieved documents into a compact context string.
+
+    Only `page_content` and the selected metadata fields are kept. Exact and
+    contained duplicates are dropped, and a chunk that starts with the tail of
+    an already selected chunk (splitter overlap) keeps only its new text.
+    Documents are added greedily in retrieval order while they fit in the
+    token budget, and only documents actually added are compared against.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        metadata_keys: Sequence[str] = ("source", "page"),
+        model_name: str = "gpt-4o",
+        separator: str = "\n\n",
+        min_overlap: int = 20,
+    ):
+        """Initialize the context packer.
+
+        Args:
+            max_tokens: Token budget for the packed context
+            metadata_keys: Metadata fields written in each document's header
+            model_name: Model whose tokenizer measures the budget
+            separator: String placed between documents
+            min_overlap: Shortest shared prefix/suffix treated as chunk overlap
+        """
+        self.max_tokens = max_tokens
+        self.metadata_keys = tuple(metadata_keys)
+        self.model_name = model_name
+        self.separator = separator
+        self.min_overlap = min_overlap
+
+    def _novel_text(self, text: str, kept: Sequence[str]) -> str:
+        """The part of `text` not already covered by the kept chunks ("" if none)."""
+        if not text or any(text in previous for previous in kept):
+            return ""
+        for previous in kept:
+            shared = _overlap(previous, text, self.min_overlap)
+            if shared:
+                return text[shared:].lstrip()
+        return text
+
+    def _serialize(self, index: int, text: str, metadata: dict) -> str:
+        fields = [
+            f"{key}: {metadata[key]}"
+            for key in self.metadata_keys
+            if metadata.get(key) is not None
+        ]
+        header = f"[{index}]" + (f" ({', '.join(fields)})" if fields else "")
+        return f"{header}\n{text}"
+
+    def pack(self, documents: Optional[Sequence[Document]]) -> str:
+        """Pack documents into a context string of at most `max_tokens` tokens.
+
+        Args:
+            documents: Retrieved documents, most relevant first
+
+        Returns:
+            The packed context
+        """
+        blocks: List[str] = []
+        kept: List[str] = []
+        used = 0
+        separator_tokens = count_tokens(self.separator, self.model_name)
+        for doc in documents or []:
+            text = self._novel_text(doc.page_content.strip(), kept)
+            if not text:
+                continue
+            block = self._serialize(len(blocks) + 1, text, doc.metadata)
+            cost = count_tokens(block, self.model_name) + (separator_tokens if blocks else 0)
+            if used + cost > self.max_tokens:
+                continue
+            # Only chunks that made it into the context count for deduplication.
+            kept.append(text)
+            blocks.append(block)
+            used += cost
+        return self.separator.join(blocks)
+
+    __call__ = pack
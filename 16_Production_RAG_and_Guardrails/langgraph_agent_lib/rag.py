@@ -1,11 +1,14 @@
 """Production RAG chain implementation with caching."""
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
+import hashlib
+import os
 import uuid
 
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.passthrough import RunnablePassthrough
 from langchain_qdrant import QdrantVectorStore
 from operator import itemgetter
@@ -13,6 +16,7 @@ from qdrant_client import QdrantClient
 from qdrant_client.http.models import Distance, VectorParams
 
 from .caching import CacheBackedEmbeddings
+from .context import ContextPacker
 from .models import get_openai_model
 
 class ProductionRAGChain:
@@ -26,7 +30,10 @@ class ProductionRAGChain:
         embedding_model: str = "text-embedding-3-small",
         llm_model: str = "gpt-4.1-nano",
         cache_dir: str = "./cache",
-        collection_name: Optional[str] = None
+        collection_name: Optional[str] = None,
+        context_max_tokens: int = 2000,
+        context_metadata_keys: Sequence[str] = ("page",),
+        persist_dir: Optional[str] = None
     ):
         """Initialize the production RAG chain.
         
@@ -38,6 +45,16 @@ class ProductionRAGChain:
             llm_model: OpenAI LLM model
             cache_dir: Directory for caching
             collection_name: Name for the vector collection
+            context_max_tokens: Token budget for the retrieved context in the prompt
+            context_metadata_keys: Document metadata fields included in the context.
+                "source" is left out by default because ingestion replaces it with a
+                chunk label that tells the model nothing
+            persist_dir: Directory for an on-disk Qdrant store. The collection is
+                keyed by the file's content hash, the chunking parameters and the
+                embedding model, so later instances attach to it and skip loading,
+                splitting and embedding. Local Qdrant locks the directory, so
+                concurrent processes each need their own copy (or a Qdrant server).
+                None keeps the per-instance in-memory store.
         """
         self.file_path = file_path
         self.chunk_size = chunk_size
@@ -45,7 +62,15 @@ class ProductionRAGChain:
         self.embedding_model = embedding_model
         self.llm_model = llm_model
         self.cache_dir = cache_dir
-        self.collection_name = collection_name or f"pdf_collection_{uuid.uuid4().hex[:8]}"
+        self.persist_dir = persist_dir
+        if persist_dir is None:
+            self.collection_name = collection_name or f"pdf_collection_{uuid.uuid4().hex[:8]}"
+        else:
+            self.collection_name = f"{collection_name or 'pdf_collection'}_{self._fingerprint()[:16]}"
+        self.context_packer = ContextPacker(
+            max_tokens=context_max_tokens,
+            metadata_keys=context_metadata_keys
+        )
         
         # Initialize components
         self._setup_text_splitter()
@@ -67,23 +92,41 @@ class ProductionRAGChain:
             cache_dir=f"{self.cache_dir}/embeddings"
         )
     
+    def _fingerprint(self) -> str:
+        """Hash of everything that determines the indexed vectors."""
+        digest = hashlib.sha256()
+        with open(self.file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(
+            f"|{self.chunk_size}|{self.chunk_overlap}|{self.embedding_model}".encode()
+        )
+        return digest.hexdigest()
+
+    def _ready_marker(self) -> str:
+        return os.path.join(self.persist_dir, f"{self.collection_name}.ready")
+
     def _setup_vectorstore(self):
-        """Set up the vector store and load documents."""
-        # Load and chunk documents
-        loader = PyMuPDFLoader(self.file_path)
-        documents = loader.load()
-        docs = self.text_splitter.split_documents(documents)
-        
-        # Add metadata
-        for i, doc in enumerate(docs):
-            doc.metadata["source"] = f"source_{i}"
-        
-        # Set up in-memory Qdrant
-        client = QdrantClient(":memory:")
-        client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(size=1536, distance=Distance.COSINE),  # OpenAI embedding size
+        """Set up the vector store, loading documents unless a persisted collection exists."""
+        if self.persist_dir is None:
+            client = QdrantClient(":memory:")
+        else:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            client = QdrantClient(path=self.persist_dir)
+
+        # A collection without its marker is left over from an interrupted ingestion.
+        self.reused_collection = (
+            self.persist_dir is not None
+            and client.collection_exists(self.collection_name)
+            and os.path.exists(self._ready_marker())
         )
+        if not self.reused_collection:
+            if client.collection_exists(self.collection_name):
+                client.delete_collection(self.collection_name)
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(size=1536, distance=Distance.COSINE),  # OpenAI embedding size
+            )
         
         # Create vector store
         self.vectorstore = QdrantVectorStore(
@@ -91,9 +134,9 @@ class ProductionRAGChain:
             collection_name=self.collection_name,
             embedding=self.cached_embeddings.get_embeddings()
         )
-        
-        # Add documents
-        self.vectorstore.add_documents(docs)
+
+        if not self.reused_collection:
+            self._ingest()
         
         # Create retriever
         self.retriever = self.vectorstore.as_retriever(
@@ -101,6 +144,23 @@ class ProductionRAGChain:
             search_kwargs={"k": 3}
         )
     
+    def _ingest(self):
+        """Load, chunk and index the PDF."""
+        loader = PyMuPDFLoader(self.file_path)
+        documents = loader.load()
+        docs = self.text_splitter.split_documents(documents)
+        
+        # Add metadata
+        for i, doc in enumerate(docs):
+            doc.metadata["source"] = f"source_{i}"
+        
+        # Add documents
+        self.vectorstore.add_documents(docs)
+
+        if self.persist_dir is not None:
+            with open(self._ready_marker(), "w") as f:
+                f.write(f"{len(docs)}\n")
+    
     def _setup_chain(self):
         """Set up the RAG chain."""
         # Create prompt template
@@ -123,7 +183,10 @@ Context:
         
         # Create chain with parallel execution
         self.chain = (
-            {"context": itemgetter("question") | self.retriever, "question": itemgetter("question")}
+            {
+                "context": itemgetter("question") | self.retriever | RunnableLambda(self.context_packer.pack),
+                "question": itemgetter("question")
+            }
             | RunnablePassthrough.assign(context=itemgetter("context"))
             | self.chat_prompt 
             | self.llm